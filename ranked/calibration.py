@@ -1,18 +1,83 @@
 import os
+import random
+from typing import Optional
+
+import numpy as np
 
 try:
     from orion.client import build_experiment
+    from orion.executor.base import executor_factory
 
     ERROR = None
 except ImportError as err:
     ERROR = err
 
+from scipy.optimize import minimize
+
+from ranked.datasets.encoded import EncodedMatchup
 from ranked.datasets.synthetic import SimulationConfig, create_simulated_matchups
+from ranked.models.ensemble import EloEnsemble, Glicko2Ensemble
+from ranked.models.glicko2 import Glicko2
 from ranked.models.noskill import NoSkill
 from ranked.simulation import Simulation
 
 
-def optimize(klass, max_trials=1000):
+def optimize(
+    klass,
+    max_trials=1000,
+    n_workers=1,
+    executor=None,
+    dataset=None,
+    algorithm=None,
+    fidelity=None,
+    n_bootstrap=100,
+    artifacts=None,
+):
+    """Search the hyperparameters of a ranker on a synthetic simulation
+
+    Parameters
+    ----------
+    klass:
+        Ranker to calibrate
+
+    max_trials:
+        Number of trials to run
+
+    n_workers:
+        Number of trials running concurrently, each trial is run in its own process
+
+    executor:
+        Orion executor running the trials, defaults to a process pool of ``n_workers``
+
+    dataset:
+        Matches replayed by every trial, generated with :func:`generate_dataset` if not provided.
+        It is moved to shared memory so the workers do not copy it
+
+    algorithm:
+        Orion search algorithm, defaults to random search or ``asha`` when ``fidelity`` is set
+
+    fidelity:
+        Smallest number of bootstrap batches a trial can be evaluated on, enables multi-fidelity
+        search: trials are first evaluated on a few batches and only the most promising ones
+        are promoted to larger budgets (successive halving).
+        The benchmark batches are scaled with the budget, see :func:`calibration_windows`
+
+    n_bootstrap:
+        Number of batches used to estimate the skills (maximum budget when ``fidelity`` is set)
+
+    artifacts:
+        Directory where each trial saves its skill evolution in a folder named after the trial,
+        by default trials do not write anything
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # trials start with 10 batches, the best ones are promoted up to 100 batches
+        optimize(NoSkill, max_trials=200, n_workers=8, fidelity=10)
+
+    """
     if ERROR is not None:
         raise ERROR
 
@@ -23,45 +88,95 @@ def optimize(klass, max_trials=1000):
     except OSError:
         pass
 
-    experiment = build_experiment(
-        "mm-calibration",
-        space=klass.parameters(center),
-        algorithms=None,
-        storage={
-            "type": "legacy",
-            "database": {
-                "type": "pickleddb",
-                "host": "./orion.pkl",
+    if dataset is None:
+        dataset = generate_dataset(center)
+    dataset.share()
+    experiment = None
+
+    try:
+        space = klass.parameters(center)
+        if fidelity is not None:
+            space["n_batches"] = f"fidelity({fidelity}, {n_bootstrap}, base=2)"
+            algorithm = algorithm or "asha"
+
+        if executor is None and n_workers > 1:
+            executor = executor_factory.create("poolexecutor", n_workers=n_workers)
+
+        # pickleddb locks the database file so concurrent workers are safe
+        experiment = build_experiment(
+            "mm-calibration",
+            space=space,
+            algorithm=algorithm,
+            storage={
+                "type": "legacy",
+                "database": {
+                    "type": "pickleddb",
+                    "host": "./orion.pkl",
+                },
             },
-        },
-    )
+            executor=executor,
+        )
+
+        experiment.workon(
+            run,
+            n_workers=n_workers,
+            center=center,
+            klass=klass,
+            max_trials=max_trials,
+            trial_arg="trial",
+            dataset=dataset,
+            n_bootstrap=n_bootstrap,
+            artifacts=artifacts,
+        )
+        print(experiment.stats)
+    finally:
+        # free the shared dataset and the database lock even if a trial fails
+        if experiment is not None:
+            experiment.close()
+        dataset.close()
 
-    experiment.workon(run, center=center, klass=klass, max_trials=max_trials)
-    print(experiment.stats)
 
-    experiment.close()
+def trial_seed(trial) -> int:
+    """Seed derived from the trial parameters so a trial is reproducible
+    regardless of the worker running it
+    """
+    return int(trial.hash_params[:8], 16)
 
 
-def run(klass, **kwargs):
+def run(
+    klass,
+    trial=None,
+    dataset=None,
+    n_bootstrap=100,
+    n_batches=None,
+    artifacts=None,
+    **kwargs,
+):
+    statfs = None
+    if trial is not None:
+        seed = trial_seed(trial)
+        random.seed(seed)
+        np.random.seed(seed)
+
+        if artifacts is not None:
+            folder = os.path.join(artifacts, trial.id)
+            os.makedirs(folder, exist_ok=True)
+            statfs = os.path.join(folder, "bootstrap.csv")
+
     ranker = klass(**kwargs)
-    objective = synthetic_calibration(ranker)
+    objective = synthetic_calibration(
+        ranker,
+        n_matches_bootstrap=int(n_batches or n_bootstrap),
+        statfs=statfs,
+        dataset=dataset,
+        max_bootstrap=n_bootstrap if n_batches is not None else None,
+    )
     print(f"    {objective:6.4f}", kwargs)
     return [dict(name="objective", type="objective", value=-objective)]
 
 
-def synthetic_calibration(
-    ranker, n_matches_bootstrap=100, n_maches_newplayers=20, n_benchmark=100
-):
-    """Simulates player and their skill estimate"""
-    print("Synthetic Benchmark")
-    print("===================")
-
-    center = 1500
-    var = 64
-    beta = 16
-    n_players = 100
-
-    config = SimulationConfig(
+def calibration_config(center=1500, var=64, beta=16) -> SimulationConfig:
+    return SimulationConfig(
         # Distribution of the skills of the entire player pool
         #   How spread the skill is between players
         #   This is a representation on how complex your game is
@@ -78,19 +193,101 @@ def synthetic_calibration(
         game_randomness=beta,
     )
 
+
+def generate_dataset(
+    center=1500, n_players=100, n_batches=200, n_team=2, n_player_per_team=5
+) -> EncodedMatchup:
+    """Simulate the matches once so every trial is evaluated on the same data.
+
+    The matchups are made by a reference Glicko2 ranker updated as the matches are played,
+    like the matchmaker of a live game would.
+    """
+    reference = Glicko2(center)
+
+    matchup = create_simulated_matchups(
+        reference,
+        n_players,
+        n_matches=n_batches,
+        n_team=n_team,
+        n_player_per_team=n_player_per_team,
+        config=calibration_config(center),
+    )
+
+    def played():
+        for batch in matchup.matches():
+            yield batch
+            reference.update(batch)
+
+    return EncodedMatchup.encode(played(), matchup.pool)
+
+
+def calibration_windows(
+    matchup: EncodedMatchup, n_matches_bootstrap, n_benchmark, max_bootstrap=None
+):
+    """Split a replay in the bootstrap batches and the benchmark batches
+
+    The benchmark starts ``n_benchmark`` batches before the end of the replay.
+    When ``max_bootstrap`` is set, only a fraction ``n_matches_bootstrap / max_bootstrap``
+    of the benchmark batches is used, so low fidelity runs are cheap to measure too;
+    runs with the same budget are measured on the same matches.
+    """
+    assert n_matches_bootstrap + n_benchmark <= matchup.n_batches
+
+    start = matchup.n_batches - n_benchmark
+    size = n_benchmark
+    if max_bootstrap is not None:
+        size = max(
+            1, min(n_benchmark, n_benchmark * n_matches_bootstrap // max_bootstrap)
+        )
+
+    return matchup.window(0, n_matches_bootstrap), matchup.window(start, start + size)
+
+
+def synthetic_calibration(
+    ranker,
+    n_matches_bootstrap=100,
+    n_maches_newplayers=20,
+    n_benchmark=100,
+    statfs=None,
+    dataset: Optional[EncodedMatchup] = None,
+    max_bootstrap=None,
+):
+    """Simulates player and their skill estimate
+
+    When a dataset is provided its matches are replayed instead of being simulated,
+    the first ``n_matches_bootstrap`` batches are used to estimate the skills
+    and the batches of :func:`calibration_windows` to measure the precision.
+    """
+    print("Synthetic Benchmark")
+    print("===================")
+
+    if dataset is not None:
+        bootstrap, benchmark = calibration_windows(
+            dataset.bind(ranker), n_matches_bootstrap, n_benchmark, max_bootstrap
+        )
+
+        sim = Simulation(ranker, bootstrap)
+        sim.simulate(statfs=statfs)
+
+        sim.matchups = benchmark
+        return sim.benchmark()["ranker_precision"]
+
+    center = 1500
+    n_players = 100
+
     matchup = create_simulated_matchups(
         ranker,
         n_players,
         n_matches=n_matches_bootstrap,
         n_team=2,
         n_player_per_team=5,
-        config=config,
+        config=calibration_config(center),
     )
 
     sim = Simulation(ranker, matchup)
 
     # Create the initial pool of players
-    sim.simulate(statfs="bootstrap.csv")
+    sim.simulate(statfs=statfs)
 
     matchup.n_matches = n_benchmark
 
@@ -99,5 +296,84 @@ def synthetic_calibration(
     return metrics["ranker_precision"]
 
 
+# ensemble, calibrated parameters and their starting values
+likelihood_models = {
+    "elo": (EloEnsemble, dict(vol=200, alpha=1)),
+    "glicko2": (Glicko2Ensemble, dict(tau=0.6, deviation=208.46, vol=0.3)),
+}
+
+
+def likelihood_calibration(
+    dataset: EncodedMatchup, model="elo", x0=None, eps=1e-4, center=1500, **options
+):
+    """Find the hyperparameters maximizing the prequential log-likelihood of a replay,
+    i.e. how well each batch is predicted by the ratings learned from the previous batches.
+
+    The gradient is estimated by central finite differences, the configuration
+    and its perturbations are replayed together by an ensemble ranker so each
+    optimization step costs a single pass over the dataset.
+    Parameters are optimized in log space to keep them positive.
+
+    Parameters
+    ----------
+    dataset:
+        Matches to replay
+
+    model:
+        ``elo`` or ``glicko2``
+
+    x0:
+        Starting value of the parameters, see ``likelihood_models``
+
+    eps:
+        Finite difference step (in log space)
+
+    options:
+        Passed to :func:`scipy.optimize.minimize`
+
+    Returns
+    -------
+    the best parameters, the log-likelihood per match and the optimization result
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        dataset = generate_dataset()
+        params, loglik, _ = likelihood_calibration(dataset, "glicko2")
+        ranker = Glicko2(tau=params["tau"])
+
+    """
+    klass, defaults = likelihood_models[model]
+    names = list(defaults)
+
+    start = dict(defaults, **(x0 or dict()))
+    x0 = np.log([start[name] for name in names])
+    n = len(names)
+    n_matches = max(int(dataset.offsets[-1] - dataset.offsets[0]), 1)
+
+    def objective(x):
+        # configuration followed by its perturbations (+eps, -eps) for each parameter
+        steps = np.concatenate([np.zeros((1, n)), np.eye(n) * eps, -np.eye(n) * eps])
+        configs = np.exp(x[None, :] + steps)
+
+        ensemble = klass(
+            dataset.n_players,
+            center=center,
+            **{name: configs[:, i] for i, name in enumerate(names)},
+        )
+        loss = -ensemble.replay(dataset) / n_matches
+
+        grad = (loss[1 : n + 1] - loss[n + 1 :]) / (2 * eps)
+        return loss[0], grad
+
+    options.setdefault("method", "L-BFGS-B")
+    result = minimize(objective, x0, jac=True, **options)
+
+    params = dict(zip(names, np.exp(result.x).tolist()))
+    return params, -result.fun, result
+
+
 if __name__ == "__main__":
-    optimize(NoSkill)
+    optimize(NoSkill, n_workers=os.cpu_count())
@@ -0,0 +1,253 @@
+import json
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ranked.datasets import Matchup
+from ranked.models import Batch, Match, Player, Ranker
+from ranked.utils.arrays import pad_matches
+from ranked.utils.shared import attach, share
+
+
+def _from_shared(descriptors, n_players):
+    teams, scores, offsets = [attach(*desc) for desc in descriptors]
+    return EncodedMatchup(teams, scores, offsets, n_players)
+
+
+class EncodedMatchup(Matchup):
+    """Matches and their results stored as arrays so they can be replayed
+    by many rankers without simulating them again.
+
+    Teams are padded with ``-1`` when matches do not all have the same shape,
+    missing teams have a ``nan`` score.
+
+    Once :meth:`share` is called the arrays live in shared memory and
+    pickling the matchup only sends the name of the segments, workers reading it
+    do not copy the data.
+
+    Parameters
+    ----------
+    teams:
+        player ids of shape ``(match, team, players)``
+
+    scores:
+        score of each team, shape ``(match, team)``
+
+    offsets:
+        index of the first match of each batch, the last element is the number of matches
+
+    n_players:
+        number of players in the pool
+
+    ranker:
+        Ranker used to build the teams, see :meth:`bind`
+
+    pool:
+        Players matching the player ids
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        dataset = EncodedMatchup.encode(matchup.matches(), matchup.pool)
+
+        # each ranker replays the same matches
+        for ranker in rankers:
+            matchup = dataset.bind(ranker)
+            Simulation(ranker, matchup).simulate(statfs=None)
+
+    """
+
+    def __init__(
+        self,
+        teams: np.ndarray,
+        scores: np.ndarray,
+        offsets: np.ndarray,
+        n_players: int,
+        ranker: Optional[Ranker] = None,
+        pool: Optional[List[Player]] = None,
+    ) -> None:
+        super().__init__(ranker)
+        self.teams = teams
+        self.scores = scores
+        self.offsets = offsets
+        self.n_players = n_players
+        self.pool = pool
+        self.shm: List[shared_memory.SharedMemory] = []
+
+    @property
+    def n_batches(self) -> int:
+        return len(self.offsets) - 1
+
+    @staticmethod
+    def from_batches(matches: List[List[List[int]]], scores, offsets, n_players):
+        """Pad a list of matches to build the arrays"""
+        teams_array, scores_array = pad_matches(matches, scores)
+
+        return EncodedMatchup(
+            teams_array, scores_array, np.asarray(offsets, dtype=np.int64), n_players
+        )
+
+    @staticmethod
+    def encode(batches: Iterable[Batch], pool: List[Player]) -> "EncodedMatchup":
+        """Record a stream of batches, e.g. ``matchup.matches()``, players are identified
+        by their position in ``pool``
+
+        The pool is read as the matchup is consumed so players added along the way are found.
+        """
+        pids: Dict[int, int] = dict()
+        matches = []
+        scores = []
+        offsets = [0]
+
+        def pid(player):
+            key = id(player)
+            if key not in pids:
+                pids.update((id(p), i) for i, p in enumerate(pool))
+            return pids[key]
+
+        for batch in batches:
+            for match in batch:
+                matches.append([[pid(p) for p in team] for team in match.teams])
+                scores.append(match.scores)
+            offsets.append(len(matches))
+
+        return EncodedMatchup.from_batches(matches, scores, offsets, len(pool))
+
+    @staticmethod
+    def load(fname: str) -> "EncodedMatchup":
+        """Load a replay saved by :class:`ranked.datasets.synthetic.MatchupReplaySaver`"""
+        rows = []
+
+        with open(fname) as data:
+            n_players = len(json.loads(data.readline()))
+
+            for line in data:
+                if line.strip():
+                    rows.append(json.loads(line))
+
+        # stable sort keeps the order of the matches inside a batch
+        rows.sort(key=lambda row: row["batch"])
+
+        matches = [[team["players"] for team in row["teams"]] for row in rows]
+        scores = [[team["score"] for team in row["teams"]] for row in rows]
+
+        batches = np.asarray([row["batch"] for row in rows], dtype=np.int64)
+        offsets = np.flatnonzero(np.diff(batches)) + 1
+        offsets = np.concatenate([[0], offsets, [len(rows)]]) if rows else [0]
+
+        encoded = EncodedMatchup.from_batches(matches, scores, offsets, n_players)
+
+        # the pool line might not include the players added during the simulation
+        if encoded.teams.size > 0:
+            encoded.n_players = max(n_players, int(encoded.teams.max()) + 1)
+
+        return encoded
+
+    def share(self) -> "EncodedMatchup":
+        """Move the arrays to shared memory"""
+        if self.shm:
+            return self
+
+        for attr in ("teams", "scores", "offsets"):
+            shm, array = share(getattr(self, attr))
+            self.shm.append(shm)
+            setattr(self, attr, array)
+
+        return self
+
+    def close(self) -> None:
+        """Release the shared memory, views created by :meth:`bind` need to be released first"""
+        shms, self.shm = self.shm, []
+
+        self.teams = self.teams.copy()
+        self.scores = self.scores.copy()
+        self.offsets = self.offsets.copy()
+
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    def __reduce__(self):
+        if not self.shm:
+            return super().__reduce__()
+
+        descriptors = [
+            (shm.name, array.shape, array.dtype.str)
+            for shm, array in zip(self.shm, (self.teams, self.scores, self.offsets))
+        ]
+        return _from_shared, (descriptors, self.n_players)
+
+    def bind(self, ranker: Ranker, pool: Optional[List[Player]] = None):
+        """Returns a view of the matches replayed for the given ranker,
+        a new pool of players is created if none is provided
+        """
+        if pool is None:
+            pool = [ranker.new_player() for _ in range(self.n_players)]
+
+        return EncodedMatchup(
+            self.teams, self.scores, self.offsets, self.n_players, ranker, pool
+        )
+
+    def window(self, start: int, end: Optional[int] = None) -> "EncodedMatchup":
+        """Returns a view of the batches between ``start`` and ``end``, the pool is shared"""
+        offsets = self.offsets[start : (end + 1 if end is not None else None)]
+
+        return EncodedMatchup(
+            self.teams,
+            self.scores,
+            offsets,
+            self.n_players,
+            self.ranker,
+            self.pool,
+        )
+
+    def decoded(self) -> Iterable[List[List[Tuple[List[int], float]]]]:
+        """Yields the matches of each batch as lists of ``(player ids, score)``,
+        the padding is removed; the result does not depend on a ranker
+        """
+        offsets = self.offsets.tolist()
+
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            teams = self.teams[start:end].tolist()
+            scores = self.scores[start:end].tolist()
+
+            batch = []
+            for match_teams, match_scores in zip(teams, scores):
+                leaderboard = []
+
+                for team, score in zip(match_teams, match_scores):
+                    if score != score:
+                        break
+
+                    leaderboard.append(([pid for pid in team if pid >= 0], score))
+
+                batch.append(leaderboard)
+
+            yield batch
+
+    def matches(self) -> Batch:
+        if self.pool is None:
+            raise RuntimeError("Matches need to be bound to a ranker first")
+
+        for batch in self.decoded():
+            yield build_batch(self.ranker, self.pool, batch)
+
+
+def build_batch(
+    ranker: Ranker, pool: List[Player], batch: List[List[Tuple[List[int], float]]]
+) -> Batch:
+    """Build the batch of a ranker from a decoded batch, see :meth:`EncodedMatchup.decoded`"""
+    return Batch(
+        *[
+            Match(
+                *[
+                    (ranker.new_team(*[pool[pid] for pid in team]), score)
+                    for team, score in leaderboard
+                ]
+            )
+            for leaderboard in batch
+        ]
+    )
@@ -1,12 +1,14 @@
 import json
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 from scipy.stats import norm, uniform
 
 from ranked.datasets import Matchup
 from ranked.matchmaker import Matchmaker
 from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.arrays import grow
 
 
 class MatchupReplaySaver:
@@ -81,23 +83,85 @@ class SimulationConfig:
 
 
 class SyntheticPlayerPool:
-    """Simulate a pool of players and their performance"""
+    """Simulate a pool of players and their performance
 
-    def __init__(self, count, config: SimulationConfig = SimulationConfig()) -> None:
+    Player attributes are stored in arrays indexed by player id,
+    retired players keep their id so the pool can only grow.
+
+    Parameters
+    ----------
+    count:
+        Number of players to start with
+
+    config:
+        Distribution of the player attributes
+
+    drift:
+        List of processes evolving the true skill of the players after each batch
+
+    """
+
+    def __init__(
+        self,
+        count,
+        config: SimulationConfig = SimulationConfig(),
+        drift: Optional[List["SkillDrift"]] = None,
+    ) -> None:
         self.skill_distribution = norm(config.skill_mean, config.skill_volatility)
         self.consistency_distribution = uniform(
             config.consistency_variability_lower,
             config.consistency_variability_upper,
         )
         self.perf_vol = config.game_randomness
-        self.player_pool = [self.new_player() for _ in range(count)]
+        self.drift: List[SkillDrift] = drift or []
+
+        self.size = 0
+        self._skills = np.zeros(count, dtype=np.float64)
+        self._consistencies = np.zeros(count, dtype=np.float64)
+        self._active = np.zeros(count, dtype=bool)
+        # skill the player would have after learning the game
+        self._potentials = np.zeros(count, dtype=np.float64)
+        # number of batches since the player last played
+        self._idle = np.zeros(count, dtype=np.int64)
+        # number of matches played
+        self._experience = np.zeros(count, dtype=np.int64)
+        self.add_players(count)
+
+    @property
+    def skills(self) -> np.ndarray:
+        return self._skills[: self.size]
+
+    @property
+    def consistencies(self) -> np.ndarray:
+        return self._consistencies[: self.size]
 
     @property
-    def players(self):
-        return self.player_pool
+    def active(self) -> np.ndarray:
+        return self._active[: self.size]
+
+    @property
+    def potentials(self) -> np.ndarray:
+        return self._potentials[: self.size]
+
+    @property
+    def idle(self) -> np.ndarray:
+        return self._idle[: self.size]
+
+    @property
+    def experience(self) -> np.ndarray:
+        return self._experience[: self.size]
+
+    @property
+    def players(self) -> List[GenPlayer]:
+        return [GenPlayer(s, c) for s, c in zip(self.skills, self.consistencies)]
 
     def performance(self, pid):
-        return self.player_pool[pid].performance(self)
+        return self.performances(pid)
+
+    def performances(self, pids) -> np.ndarray:
+        """Sample a performance rating for each player, ``pids`` can be of any shape"""
+        skill = np.random.normal(self.skills[pids], self.consistencies[pids])
+        return np.random.normal(skill, self.perf_vol)
 
     def new_player(self, skill=None, consistency=None) -> GenPlayer:
         # Sample player skill & consistency
@@ -105,6 +169,198 @@ class SyntheticPlayerPool:
         consistency = consistency or self.consistency_distribution.rvs()
         return GenPlayer(skill, consistency)
 
+    def add_players(self, count, skill=None, consistency=None) -> np.ndarray:
+        """Sample ``count`` new players and add them to the pool
+
+        Returns
+        -------
+        the ids of the new players
+        """
+        start = self.size
+        self.size += count
+
+        self._skills = grow(self._skills, self.size)
+        self._consistencies = grow(self._consistencies, self.size)
+        self._active = grow(self._active, self.size)
+        self._potentials = grow(self._potentials, self.size)
+        self._idle = grow(self._idle, self.size)
+        self._experience = grow(self._experience, self.size)
+
+        if skill is None:
+            skill = self.skill_distribution.rvs(size=count)
+
+        if consistency is None:
+            consistency = self.consistency_distribution.rvs(size=count)
+
+        self._skills[start : self.size] = skill
+        self._consistencies[start : self.size] = consistency
+        self._active[start : self.size] = True
+        self._potentials[start : self.size] = skill
+        self._idle[start : self.size] = 0
+        self._experience[start : self.size] = 0
+
+        pids = np.arange(start, self.size)
+        for drift in self.drift:
+            drift.new_players(self, pids)
+
+        return pids
+
+    def replace_player(self, pid, skill=None, consistency=None) -> GenPlayer:
+        """Sample a new player in place of an existing one"""
+        p = self.new_player(skill, consistency)
+        self._skills[pid] = p.skill
+        self._consistencies[pid] = p.consistency
+        self._active[pid] = True
+        self._potentials[pid] = p.skill
+        self._idle[pid] = 0
+        self._experience[pid] = 0
+
+        for drift in self.drift:
+            drift.new_players(self, np.array([pid]))
+
+        return p
+
+    def retire_players(self, pids) -> None:
+        self._active[pids] = False
+
+    def active_pids(self) -> np.ndarray:
+        return np.flatnonzero(self.active)
+
+    def step(self, played) -> None:
+        """Advance the skill of every player by one batch
+
+        Parameters
+        ----------
+        played:
+            ids of the players that played during the batch
+
+        """
+        self.idle[:] += 1
+        self._idle[played] = 0
+        self._experience[played] += 1
+
+        for drift in self.drift:
+            drift.step(self, played)
+
+
+class SkillDrift:
+    """Evolve the true skill of all the players of a pool at once"""
+
+    def new_players(self, pool: SyntheticPlayerPool, pids: np.ndarray) -> None:
+        """Initialize the drift state of newly added players"""
+        pass
+
+    def step(self, pool: SyntheticPlayerPool, played: np.ndarray) -> None:
+        """Move the skill of the players after a batch"""
+        raise NotImplementedError()
+
+
+class RandomWalkDrift(SkillDrift):
+    """Active players skill follows a gaussian random walk
+
+    Parameters
+    ----------
+    volatility:
+        Standard deviation of the skill change per batch
+
+    """
+
+    def __init__(self, volatility: float) -> None:
+        self.volatility = volatility
+
+    def step(self, pool, played):
+        active = pool.active
+        pool.skills[active] += np.random.normal(0, self.volatility, active.sum())
+
+
+class LearningCurveDrift(SkillDrift):
+    """New players start below their potential and close the gap as they play
+
+    Parameters
+    ----------
+    gap:
+        How far below their potential new players start
+
+    rate:
+        Fraction of the remaining gap closed after each match played
+
+    """
+
+    def __init__(self, gap: float, rate: float = 0.05) -> None:
+        self.gap = gap
+        self.rate = rate
+
+    def new_players(self, pool, pids):
+        pool.skills[pids] = pool.potentials[pids] - self.gap
+
+    def step(self, pool, played):
+        skills = pool.skills
+        skills[played] += self.rate * (pool.potentials[played] - skills[played])
+
+
+class InactivityDecay(SkillDrift):
+    """Players lose skill when they do not play, the loss is recovered
+    when combined with :class:`LearningCurveDrift`
+
+    Parameters
+    ----------
+    rate:
+        Skill lost per idle batch
+
+    grace:
+        Number of idle batches before the skill starts decaying
+
+    max_loss:
+        Maximum skill that can be lost relative to the player potential
+
+    """
+
+    def __init__(self, rate: float, grace: int = 1, max_loss: float = np.inf) -> None:
+        self.rate = rate
+        self.grace = grace
+        self.max_loss = max_loss
+
+    def step(self, pool, played):
+        skills = pool.skills
+        decaying = pool.active & (pool.idle > self.grace)
+
+        current = skills[decaying]
+        floor = np.minimum(current, pool.potentials[decaying] - self.max_loss)
+        skills[decaying] = np.maximum(current - self.rate, floor)
+
+
+@dataclass
+class ChurnModel:
+    """Player arrivals and departures happening between two batches
+
+    Attributes
+    ----------
+    arrival_rate:
+        Expected number of new players joining per batch (poisson)
+
+    retire_rate:
+        Probability of an active player leaving after a batch
+
+    """
+
+    arrival_rate: float = 0
+    retire_rate: float = 0
+
+    def arrivals(self) -> int:
+        return int(np.random.poisson(self.arrival_rate))
+
+    def departures(self, active_pids: np.ndarray) -> np.ndarray:
+        """Select the players leaving the pool, cost is proportional to the departures"""
+        n = len(active_pids)
+        count = np.random.binomial(n, self.retire_rate) if n else 0
+
+        if count == 0:
+            return active_pids[:0]
+
+        # sampling with replacement then dropping duplicates avoids
+        # a full permutation of the pool
+        return active_pids[np.unique(np.random.randint(0, n, size=count))]
+
 
 class SimulateMatch:
     """Simulate the outcome of a given match
@@ -143,23 +399,43 @@ class SimulateMatch:
         a Match object which contains the scoreboard of the simulated match
         it can be passed to a Ranker to update the skill.
         """
-        scoreboard: List[Tuple[Team, float]] = []
+        return self.simulate_batch([teams])[0]
+
+    def simulate_batch(self, matches: List[List[List[int]]]) -> List[Match]:
+        """Simulate the outcome of many matches, performances are sampled
+        for all the players at once when every match has the same shape
+        """
+        if not matches:
+            return []
+
+        try:
+            # (match, team)
+            pids = np.asarray(matches, dtype=np.int64)
+            scores = self.model.performances(pids).sum(axis=-1).tolist()
+        except ValueError:
+            # ragged matches, sample one team at a time
+            scores = [
+                [self.model.performances(team).sum() for team in teams]
+                for teams in matches
+            ]
 
-        for team in teams:
-            score = 0
-            for player_id in team:
-                score += self.model.performance(player_id)
+        results = []
+        for teams, team_scores in zip(matches, scores):
+            scoreboard: List[Tuple[Team, float]] = []
 
-            # Generate a Ranker Team to run our algo
-            team = self.ranker.new_team(*[self.pool[player_id] for player_id in team])
-            scoreboard.append((team, score))
+            for team, score in zip(teams, team_scores):
+                # Generate a Ranker Team to run our algo
+                team = self.ranker.new_team(*[self.pool[pid] for pid in team])
+                scoreboard.append((team, score))
 
-        return Match(*scoreboard)
+            results.append(Match(*scoreboard))
+
+        return results
 
 
 class SimulatedMatchup(Matchup):
     def __init__(
-        self, ranker, pool, model, n_matches, n_team, n_player_per_team
+        self, ranker, pool, model, n_matches, n_team, n_player_per_team, churn=None
     ) -> None:
         self.model = model
         self._pool = pool
@@ -171,6 +447,7 @@ class SimulatedMatchup(Matchup):
         self.batch_id = 0
         self.n_matches = n_matches
         self.ranker = ranker
+        self.churn: Optional[ChurnModel] = churn
         self.reset()
 
     def set_estimate_to_truth(self):
@@ -195,29 +472,48 @@ class SimulatedMatchup(Matchup):
         if self.pool is None:
             raise RuntimeError("No existing player pool")
 
-        p = self.model.new_player(*args)
-        self.model.player_pool.append(p)
-        self._pool.append(self.ranker.new_player())
+        pid = self.add_players(1, *args)[0]
+        return GenPlayer(self.model.skills[pid], self.model.consistencies[pid])
 
-        # reset the matchmaker so he uses the updated pool
-        self.reset()
+    def add_players(self, count, skill=None, consistency=None) -> np.ndarray:
+        """Insert ``count`` new players to the simulation and the matchmaker"""
+        pids = self.model.add_players(count, skill, consistency)
+        mm_pids = self.mm.add_players([self.ranker.new_player() for _ in pids])
 
-        return p
+        # the model and the ranker pool need to stay aligned
+        assert len(pids) == 0 or pids[0] == mm_pids[0]
+        return pids
+
+    def retire_players(self, pids) -> None:
+        """Remove players from the simulation, their ids are not reused"""
+        self.model.retire_players(pids)
+        self.mm.remove_players(np.asarray(pids).tolist())
 
     def replace_player(self, *args, i=-1):
         """Replace an older player with a new one"""
         if self.pool is None:
             raise RuntimeError("No existing player pool")
 
-        p = self.model.new_player(*args)
-        self.model.player_pool[i] = p
-        self._pool[i] = self.ranker.new_player()
+        if i < 0:
+            i += self.model.size
 
-        # reset the matchmaker so he uses the updated pool
-        self.reset()
+        self.model.replace_player(i, *args)
+        self.mm.replace_player(i, self.ranker.new_player())
+
+    def apply_churn(self) -> None:
+        """Retire and add players according to the churn model"""
+        if self.churn is None:
+            return
+
+        self.retire_players(self.churn.departures(self.model.active_pids()))
+
+        arrivals = self.churn.arrivals()
+        if arrivals > 0:
+            self.add_players(arrivals)
 
     def reset(self):
         self.mm = Matchmaker(self._pool, self.n_team, self.n_player_per_team)
+        self.mm.remove_players(np.flatnonzero(~self.model.active).tolist())
 
     @property
     def pool(self):
@@ -225,21 +521,46 @@ class SimulatedMatchup(Matchup):
 
     def matches(self) -> Batch:
         for i in range(self.n_matches):
-            batch = []
-
             # Group players in teams
-            for teams in self.mm.matches():
+            matches = self.mm.matches()
 
-                # Simulate match outcomes
-                result: Match = self.sim.simulate(teams)
+            # Simulate match outcomes
+            batch: List[Match] = self.sim.simulate_batch(matches)
 
-                if self.saver is not None:
+            if self.saver is not None:
+                for teams, result in zip(matches, batch):
                     self.saver.save(i, teams, result)
 
-                batch.append(result)
-
             yield Batch(*batch)
 
+            self.model.step(_played(matches))
+            self.apply_churn()
+
+    def tracking_error(self) -> float:
+        """Root mean squared difference between the estimated skill
+        and the true skill of the active players.
+
+        The ranker and the model use different scales, both are standardized (z-score)
+        so the error is 0 when the estimates are an increasing linear function of the true skills
+        and 2 when they are reversed.
+        """
+        pids = self.model.active_pids()
+        estimates = np.fromiter((self._pool[pid].skill() for pid in pids), float)
+        diff = _standardize(estimates) - _standardize(self.model.skills[pids])
+        return float(np.sqrt(np.mean(diff**2)))
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / (std if std > 0 else 1)
+
+
+def _played(matches: List[List[List[int]]]) -> np.ndarray:
+    """Flatten the ids of the players of a batch"""
+    return np.fromiter(
+        (pid for teams in matches for team in teams for pid in team), np.int64
+    )
+
 
 def create_simulated_matchups(
     ranker,
@@ -250,12 +571,16 @@ def create_simulated_matchups(
     config=SimulationConfig(),
     pool=None,
     model=None,
+    churn=None,
+    drift=None,
 ) -> SimulatedMatchup:
     """Generate new players from a model and initialize a SimulatedMatchup dataset"""
     if model is None:
-        model = SyntheticPlayerPool(n_players, config)
+        model = SyntheticPlayerPool(n_players, config, drift=drift)
 
     if pool is None:
         pool = [ranker.new_player() for _ in range(n_players)]
 
-    return SimulatedMatchup(ranker, pool, model, n_matches, n_team, n_player_per_team)
+    return SimulatedMatchup(
+        ranker, pool, model, n_matches, n_team, n_player_per_team, churn=churn
+    )
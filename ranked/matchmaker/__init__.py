@@ -0,0 +1,311 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ranked.matchmaker.balance import partition, shuffle_teams, team_members
+from ranked.models import Player
+from ranked.utils.arrays import grow
+
+# List of player matched together
+MatchMakerTeam = List[int]
+# List of teams of a given match
+MatchMakerMatch = List[MatchMakerTeam]
+
+
+class Matchmaker:
+    """Build teams of player based on their estimated skill bracket.
+    The goal of the matchmaker is to builds teams of similar strength
+    to gives every teams a fair chance of winning.
+
+    Players are kept in an array sorted by skill which is repaired
+    at the start of each round; only the players whose skill might have changed
+    (i.e. the players matched in the previous round, new players and players marked dirty)
+    have their skill queried, the rest of the index is reused as is.
+
+    Notes
+    -----
+
+    * Party support requires its own matchmaker, see :class:`ranked.matchmaker.party.PartyMatchmaker`
+    * The pool is shared with the caller, new players are appended to it
+      and retired players are kept so player ids remain stable
+    * Call :meth:`mark_dirty` when a player skill is changed outside of a match
+    * When the players cannot all be matched, the players that waited the least
+      sit out, ``wait`` counts the rounds each player spent in the queue since their last match
+
+    Parameters
+    ----------
+    pool:
+        List of players
+
+    n_team:
+        Number of teams per match
+
+    n_players:
+        Number of players per team
+
+    balance:
+        Method used to split the players of a match into teams,
+        see :func:`ranked.matchmaker.balance.partition`
+
+    lobby_sizes:
+        Additional ``(n_team, n_players)`` lobby formats used to match
+        the players left over by the main format
+
+    Examples
+    --------
+
+    Two 5v5 and one 3v3 can be played with 26 players
+
+    >>> mm = Matchmaker([None], lobby_sizes=[(2, 4), (2, 3)])
+    >>> mm.plan(26)
+    [(2, 2, 5), (1, 2, 3)]
+
+    """
+
+    def __init__(
+        self,
+        pool: List[Player],
+        n_team: int = 2,
+        n_players: int = 5,
+        balance: str = "kk",
+        lobby_sizes: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> None:
+        # players should never be reordered
+        self.players = pool
+        self.first_player = self.players[0]
+
+        n = len(pool)
+
+        # players_pid is sorted by skill, skills holds the matching skill
+        self.players_pid = np.zeros(0, dtype=np.int64)
+        self.skills = np.zeros(0, dtype=np.float64)
+
+        # per player states
+        self.active = np.ones(n, dtype=bool)
+        self.dirty = np.ones(n, dtype=bool)
+        self.n_active = n
+        self._dirty = [np.arange(n)]
+
+        # rounds spent waiting since the last match
+        self.wait = np.zeros(n, dtype=np.int64)
+        # wait of the players matched during the last round
+        self.last_wait = np.zeros(0, dtype=np.int64)
+
+        self.n_team = n_team
+        self.n_players = n_players
+        self.n_player_match = self.n_team * self.n_players
+        self.balance = balance
+        self.saver = None
+
+        self.lobby_sizes = [(n_team, n_players)]
+        self.lobby_sizes.extend(
+            size for size in (lobby_sizes or []) if size != (n_team, n_players)
+        )
+
+    @property
+    def n_matches(self) -> int:
+        return sum(count for count, _, _ in self.plan(self.n_active))
+
+    def plan(self, n: int) -> List[Tuple[int, int, int]]:
+        """Choose how many lobbies of each format to play with ``n`` players,
+        the main format is used as much as possible while leaving out the fewest players
+
+        Returns
+        -------
+        list of ``(count, n_team, n_players)``
+        """
+        sizes = [t * p for t, p in self.lobby_sizes]
+        main = n // sizes[0]
+
+        best: Optional[Tuple[int, List[int]]] = None
+
+        # give up a few main lobbies if the others formats can fill the gap
+        for k in range(min(main, max(sizes)) + 1):
+            rest = n - (main - k) * sizes[0]
+            counts = _fill(rest, sizes[1:])
+            covered = n - rest + sum(c * s for c, s in zip(counts, sizes[1:]))
+
+            if best is None or covered > best[0]:
+                best = (covered, [main - k] + counts)
+
+            if covered == n:
+                break
+
+        return [
+            (count, t, p)
+            for count, (t, p) in zip(best[1], self.lobby_sizes)
+            if count > 0
+        ]
+
+    def save_replay(self, saver):
+        self.saver = saver
+
+    def add_players(self, players: Sequence[Player]) -> List[int]:
+        """Append new players to the pool and make them available for matchmaking
+
+        Returns
+        -------
+        the ids of the new players
+        """
+        start = len(self.players)
+        self.players.extend(players)
+        end = len(self.players)
+
+        self.active = grow(self.active, end)
+        self.dirty = grow(self.dirty, end)
+        self.wait = grow(self.wait, end)
+        self.active[start:end] = True
+        self.wait[start:end] = 0
+        self.n_active += end - start
+        self.mark_dirty(np.arange(start, end))
+
+        return list(range(start, end))
+
+    def remove_players(self, pids: Sequence[int]) -> None:
+        """Stop matching the given players, their id is not reused.
+        They are dropped from the index during the next repair
+        """
+        pids = np.unique(np.asarray(pids, dtype=np.int64))
+        pids = pids[self.active[pids]]
+
+        self.active[pids] = False
+        self.n_active -= len(pids)
+
+    def replace_player(self, pid: int, player: Player) -> None:
+        """Put a new player in place of ``pid``, the id is made available again if it was removed"""
+        self.players[pid] = player
+
+        if pid == 0:
+            self.first_player = player
+
+        if not self.active[pid]:
+            self.active[pid] = True
+            self.n_active += 1
+
+        self.wait[pid] = 0
+        self.mark_dirty([pid])
+
+    def mark_dirty(self, pids: Sequence[int]) -> None:
+        """Schedule the skill of the given players to be refreshed"""
+        # players already pending are not queued twice
+        pids = np.unique(np.asarray(pids, dtype=np.int64))
+        pids = pids[~self.dirty[pids]]
+
+        self.dirty[pids] = True
+        self._dirty.append(pids)
+
+    def refresh(self) -> None:
+        """Repair the skill index for the players that were marked dirty"""
+        dirty = np.concatenate(self._dirty) if self._dirty else self.players_pid[:0]
+        self._dirty = []
+
+        # drop the retired players and the players which need to be moved
+        entries = self.players_pid
+        keep = self.active[entries] & ~self.dirty[entries]
+        players_pid = entries[keep]
+        skills = self.skills[keep]
+
+        self.dirty[dirty] = False
+        dirty = dirty[self.active[dirty]]
+
+        # only query the skill of the players that changed
+        new_skills = np.fromiter(
+            (self.players[pid].skill() for pid in dirty.tolist()),
+            dtype=np.float64,
+            count=len(dirty),
+        )
+        order = np.argsort(new_skills, kind="stable")
+        dirty = dirty[order]
+        new_skills = new_skills[order]
+
+        # merge them back in
+        position = np.searchsorted(skills, new_skills)
+        self.players_pid = np.insert(players_pid, position, dirty)
+        self.skills = np.insert(skills, position, new_skills)
+
+    def sit_out(self, n: int) -> np.ndarray:
+        """Select the ``n`` players of the index that waited the least, ties are broken at random
+
+        Returns
+        -------
+        mask of the players of the index that are matched this round
+        """
+        keep = np.ones(len(self.players_pid), dtype=bool)
+
+        if n > 0:
+            priority = self.wait[self.players_pid] + np.random.random(len(keep))
+            keep[np.argpartition(priority, n - 1)[:n]] = False
+
+        return keep
+
+    def matched(self, pids: np.ndarray) -> None:
+        """Reset the wait of the matched players and schedule their skill update"""
+        pids = pids.ravel()
+
+        self.last_wait = self.wait[pids]
+        self.wait += 1
+        self.wait[pids] = 0
+
+        # matched players are going to get their skill updated
+        self.mark_dirty(pids)
+
+    def matches(self) -> List[MatchMakerMatch]:
+        # sort players by their estimated skill
+        self.refresh()
+
+        plan = self.plan(self.n_active)
+        n_matched = sum(c * t * p for c, t, p in plan)
+
+        keep = self.sit_out(len(self.players_pid) - n_matched)
+        players_pid = self.players_pid[keep]
+        skills = self.skills[keep]
+
+        # lobby format of each match, shuffled so no format gets a given skill range
+        formats = np.repeat(np.arange(len(plan)), [c for c, _, _ in plan])
+        np.random.shuffle(formats)
+
+        sizes = np.array([t * p for _, t, p in plan], dtype=np.int64)[formats]
+        starts = np.cumsum(sizes) - sizes
+
+        batch: List[MatchMakerMatch] = []
+        for i, (_, n_team, n_players) in enumerate(plan):
+            # (match, players)
+            positions = starts[formats == i, None] + np.arange(n_team * n_players)
+            pool = players_pid[positions]
+
+            # split each match in teams of similar strength
+            # and randomize team order so no side is favored
+            teams = partition(skills[positions], n_team, self.balance)
+            teams = shuffle_teams(teams, n_team)
+
+            # (match, team, players)
+            batch.extend(team_members(pool, teams, n_team).tolist())
+
+        self.matched(players_pid)
+
+        # players cannot be shuffled
+        # we rely on the order to give use the player id
+        assert self.first_player is self.players[0]
+        return batch
+
+
+def _fill(n: int, sizes: Sequence[int]) -> List[int]:
+    """Number of lobbies of each size covering as many of the ``n`` players as possible"""
+    # best[i]: lobby size used last to cover exactly i players
+    best = [-1] + [None] * n
+
+    for i in range(1, n + 1):
+        for j, size in enumerate(sizes):
+            if size <= i and best[i - size] is not None:
+                best[i] = j
+                break
+
+    covered = max(i for i in range(n + 1) if best[i] is not None)
+
+    counts = [0] * len(sizes)
+    while covered > 0:
+        j = best[covered]
+        counts[j] += 1
+        covered -= sizes[j]
+
+    return counts
@@ -0,0 +1,279 @@
+"""Split the players of many matches into teams of equal size and similar strength.
+
+Every function works on all the matches of a round at once,
+``skills`` is an array of shape ``(match, players)`` and the result is
+the team index of each player with the same shape.
+"""
+
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def _sorted_desc(skills: np.ndarray):
+    order = np.argsort(-skills, axis=1, kind="stable")
+    return order, np.take_along_axis(skills, order, axis=1)
+
+
+def _unsort(order: np.ndarray, teams: np.ndarray) -> np.ndarray:
+    result = np.empty_like(teams)
+    np.put_along_axis(result, order, teams, axis=1)
+    return result
+
+
+def roundrobin(skills: np.ndarray, n_team: int) -> np.ndarray:
+    """Shuffle the players and deal them to each team"""
+    n_match, n_player = skills.shape
+    order = np.argsort(np.random.random(skills.shape), axis=1)
+    teams = np.broadcast_to(np.arange(n_player) % n_team, skills.shape)
+    return _unsort(order, np.ascontiguousarray(teams))
+
+
+def snake(skills: np.ndarray, n_team: int) -> np.ndarray:
+    """Snake draft, teams pick in order 0, 1, ..., T - 1, T - 1, ..., 0, 0, 1, ..."""
+    n_match, n_player = skills.shape
+    order, _ = _sorted_desc(skills)
+
+    pick = np.arange(n_player)
+    rnd, slot = pick // n_team, pick % n_team
+    draft = np.where(rnd % 2 == 0, slot, n_team - 1 - slot)
+
+    teams = np.broadcast_to(draft, skills.shape)
+    return _unsort(order, np.ascontiguousarray(teams))
+
+
+def greedy(skills: np.ndarray, n_team: int) -> np.ndarray:
+    """Give the best remaining player to the weakest team that is not full"""
+    n_match, n_player = skills.shape
+    n_size = n_player // n_team
+    order, values = _sorted_desc(skills)
+
+    rows = np.arange(n_match)
+    sums = np.zeros((n_match, n_team))
+    counts = np.zeros((n_match, n_team), dtype=np.int64)
+    teams = np.zeros((n_match, n_player), dtype=np.int64)
+
+    for i in range(n_player):
+        candidates = np.where(counts < n_size, sums, np.inf)
+        team = np.argmin(candidates, axis=1)
+
+        teams[:, i] = team
+        sums[rows, team] += values[:, i]
+        counts[rows, team] += 1
+
+    return _unsort(order, teams)
+
+
+def karmarkar_karp(skills: np.ndarray, n_team: int) -> np.ndarray:
+    """Balanced largest differencing method
+
+    Sorted players are grouped in tuples of ``n_team`` players, each tuple is a partial
+    solution with one player per team. The two partial solutions with the largest
+    spread are merged by pairing the strongest team of one with the weakest of the other
+    until only one remains. Teams keep the same number of players throughout.
+    """
+    n_match, n_player = skills.shape
+    n_part = n_player // n_team
+    order, values = _sorted_desc(skills)
+
+    rows = np.arange(n_match)[:, None]
+
+    # (match, partial, team)
+    sums = values.reshape(n_match, n_part, n_team).copy()
+
+    # partial solution and team of each (sorted) player
+    part = np.repeat(np.arange(n_part), n_team)[None, :].repeat(n_match, axis=0)
+    slot = np.tile(np.arange(n_team), n_part)[None, :].repeat(n_match, axis=0)
+
+    alive = np.ones((n_match, n_part), dtype=bool)
+
+    for _ in range(n_part - 1):
+        spread = np.where(alive, sums.max(axis=2) - sums.min(axis=2), -np.inf)
+        top = np.argsort(-spread, axis=1)[:, :2]
+        a, b = top[:, 0:1], top[:, 1:2]
+
+        sa = sums[rows, a][:, 0]
+        sb = sums[rows, b][:, 0]
+
+        # strongest of a with the weakest of b
+        order_a = np.argsort(sa, axis=1)
+        order_b = np.argsort(-sb, axis=1)
+
+        sums[rows, a] = (
+            np.take_along_axis(sa, order_a, axis=1)
+            + np.take_along_axis(sb, order_b, axis=1)
+        )[:, None]
+        alive[rows, b] = False
+
+        # new slot of each old slot
+        inv_a = np.argsort(order_a, axis=1)
+        inv_b = np.argsort(order_b, axis=1)
+
+        in_a = part == a
+        in_b = part == b
+        slot = np.where(in_a, np.take_along_axis(inv_a, slot, axis=1), slot)
+        slot = np.where(in_b, np.take_along_axis(inv_b, slot, axis=1), slot)
+        part = np.where(in_b, a, part)
+
+    return _unsort(order, slot)
+
+
+def local_search(skills: np.ndarray, teams: np.ndarray, n_team: int, steps: int = 2):
+    """Improve an assignment by swapping a player of the strongest team
+    with a player of the weakest team when it reduces their difference
+    """
+    n_match, n_player = skills.shape
+    n_size = n_player // n_team
+
+    rows = np.arange(n_match)
+    teams = teams.copy()
+
+    for _ in range(steps):
+        # (match, team, players) position of each team member
+        members = np.argsort(teams, axis=1, kind="stable").reshape(
+            n_match, n_team, n_size
+        )
+        member_skill = np.take_along_axis(skills, members.reshape(n_match, -1), 1)
+        member_skill = member_skill.reshape(n_match, n_team, n_size)
+
+        sums = member_skill.sum(axis=2)
+        hi = np.argmax(sums, axis=1)
+        lo = np.argmin(sums, axis=1)
+        diff = sums[rows, hi] - sums[rows, lo]
+
+        # swapping x (from hi) with y (from lo) changes the difference by 2 (x - y)
+        x = member_skill[rows, hi][:, :, None]
+        y = member_skill[rows, lo][:, None, :]
+        new_diff = np.abs(diff[:, None, None] - 2 * (x - y)).reshape(n_match, -1)
+
+        best = np.argmin(new_diff, axis=1)
+        improved = new_diff[rows, best] < diff - 1e-12
+
+        if not improved.any():
+            break
+
+        i, j = np.divmod(best, n_size)
+        px = members[rows, hi, i]
+        py = members[rows, lo, j]
+
+        r = rows[improved]
+        teams[r, px[improved]] = lo[improved]
+        teams[r, py[improved]] = hi[improved]
+
+    return teams
+
+
+strategies: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = {
+    "roundrobin": roundrobin,
+    "snake": snake,
+    "greedy": greedy,
+    "kk": karmarkar_karp,
+}
+
+
+def partition(
+    skills: np.ndarray, n_team: int, method: str = "kk", steps: int = 2
+) -> np.ndarray:
+    """Assign the players of each match to a team
+
+    Parameters
+    ----------
+    skills:
+        array of shape ``(match, players)``, ``players`` must be a multiple of ``n_team``
+
+    n_team:
+        number of teams per match
+
+    method:
+        ``roundrobin``, ``snake``, ``greedy`` or ``kk`` (Karmarkar-Karp)
+
+    steps:
+        maximum number of local search swaps applied after the initial assignment
+
+    Returns
+    -------
+    team index of each player, array of shape ``(match, players)``
+
+    Examples
+    --------
+    >>> partition(np.array([[10, 8, 7, 6, 5, 4]]), 2)
+    array([[1, 0, 0, 1, 0, 1]])
+
+    """
+    skills = np.asarray(skills, dtype=np.float64)
+    strategy = strategies.get(method)
+
+    if strategy is None:
+        raise ValueError(f"Unknown balancing method {method}")
+
+    if skills.shape[0] == 0:
+        return np.zeros(skills.shape, dtype=np.int64)
+
+    teams = strategy(skills, n_team)
+
+    if steps > 0 and method != "roundrobin":
+        teams = local_search(skills, teams, n_team, steps)
+
+    return teams
+
+
+def shuffle_teams(teams: np.ndarray, n_team: int) -> np.ndarray:
+    """Randomly relabel the teams of each match so no team index is favored"""
+    labels = np.argsort(np.random.random((teams.shape[0], n_team)), axis=1)
+    return np.take_along_axis(labels, teams, axis=1)
+
+
+def team_members(pids: np.ndarray, teams: np.ndarray, n_team: int) -> np.ndarray:
+    """Group players by team, returns an array of shape ``(match, team, players)``"""
+    n_match, n_player = pids.shape
+    members = np.argsort(teams, axis=1, kind="stable")
+    grouped = np.take_along_axis(pids, members, axis=1)
+    return grouped.reshape(n_match, n_team, n_player // n_team)
+
+
+def balance_lobby(skills: Sequence[float], n_team: int, steps: int = 2) -> List[int]:
+    """Pure python version of greedy + local search for a single match,
+    used when matches are produced one at a time and numpy overhead would dominate
+    """
+    n_size = len(skills) // n_team
+    order = sorted(range(len(skills)), key=lambda i: -skills[i])
+
+    sums = [0.0] * n_team
+    members: List[List[int]] = [[] for _ in range(n_team)]
+
+    for i in order:
+        team = min(
+            (t for t in range(n_team) if len(members[t]) < n_size),
+            key=lambda t: sums[t],
+        )
+        members[team].append(i)
+        sums[team] += skills[i]
+
+    for _ in range(steps):
+        hi = max(range(n_team), key=lambda t: sums[t])
+        lo = min(range(n_team), key=lambda t: sums[t])
+        diff = sums[hi] - sums[lo]
+
+        best, swap = diff, None
+        for x in members[hi]:
+            for y in members[lo]:
+                new_diff = abs(diff - 2 * (skills[x] - skills[y]))
+                if new_diff < best - 1e-12:
+                    best, swap = new_diff, (x, y)
+
+        if swap is None:
+            break
+
+        x, y = swap
+        members[hi][members[hi].index(x)] = y
+        members[lo][members[lo].index(y)] = x
+        delta = skills[x] - skills[y]
+        sums[hi] -= delta
+        sums[lo] += delta
+
+    teams = [0] * len(skills)
+    for t, team in enumerate(members):
+        for i in team:
+            teams[i] = t
+
+    return teams
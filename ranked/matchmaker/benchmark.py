@@ -0,0 +1,256 @@
+"""Measure the speed and the fairness of the matchmakers on large synthetic queues.
+
+Every player of the queue is matched as often as possible, after each round
+the rating of the matched players moves a little so the matchmakers have to repair
+their index like they would in a live system.
+
+Matchmakers that are not round based are adapted: the queue matchmaker receives the
+players as join events and each round lasts one second of its clock,
+the party matchmaker receives random premade groups that queue again after their match.
+
+.. code-block:: bash
+
+   python -m ranked.matchmaker.benchmark --players 10000 100000 1000000 --rounds 10
+
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from ranked.matchmaker import Matchmaker, MatchMakerMatch
+from ranked.matchmaker.party import PartyMatchmaker
+from ranked.matchmaker.quality import QualityMatchmaker
+from ranked.matchmaker.queue import QueueMatchmaker
+from ranked.matchmaker.sharded import ShardedMatchmaker
+from ranked.models.glicko2 import Glicko2, Glicko2Player
+
+MatchmakerFactory = Callable[[List[Glicko2Player], int, int], object]
+
+
+class QueueRounds:
+    """Feed a :class:`QueueMatchmaker` round by round, players join the queue
+    at the start and again after their match, a round lasts one second
+    """
+
+    def __init__(self, pool: List[Glicko2Player], n_team: int, n_players: int) -> None:
+        self.pool = pool
+        self.now = 0
+        self.mm = QueueMatchmaker(n_team, n_players, clock=lambda: self.now)
+        self.joining = list(range(len(pool)))
+
+    def matches(self) -> List[MatchMakerMatch]:
+        batch = self.mm.tick()
+
+        for pid in self.joining:
+            player = self.pool[pid]
+            match = self.mm.join(pid, player.skill(), player.consistency())
+
+            if match is not None:
+                batch.append(match)
+
+        self.joining = [pid for teams in batch for team in teams for pid in team]
+        self.now += 1
+        return batch
+
+
+class PartyRounds:
+    """Split the pool in premade groups for a :class:`PartyMatchmaker`,
+    the groups queue again after their match
+    """
+
+    def __init__(
+        self,
+        pool: List[Glicko2Player],
+        n_team: int,
+        n_players: int,
+        sizes=(1, 1, 1, 2, 2, 3, 5),
+    ) -> None:
+        self.mm = PartyMatchmaker(pool, n_team, n_players)
+
+        pid = 0
+        while pid < len(pool):
+            size = min(int(np.random.choice(sizes)), n_players, len(pool) - pid)
+            self.mm.add_party(range(pid, pid + size))
+            pid += size
+
+    def matches(self) -> List[MatchMakerMatch]:
+        queued = dict(self.mm.parties)
+        batch = self.mm.matches()
+
+        for party, members in queued.items():
+            if party not in self.mm.parties:
+                self.mm.add_party(members)
+
+        return batch
+
+
+matchmakers: Dict[str, MatchmakerFactory] = {
+    "sorted": lambda pool, t, p: Matchmaker(pool, t, p),
+    "snake": lambda pool, t, p: Matchmaker(pool, t, p, balance="snake"),
+    "mixed": lambda pool, t, p: Matchmaker(
+        pool, t, p, lobby_sizes=[(t, p - 1), (t, p - 2)]
+    ),
+    "quality": lambda pool, t, p: QualityMatchmaker(pool, Glicko2(), t, p),
+    "sharded": lambda pool, t, p: ShardedMatchmaker(
+        pool, np.random.randint(0, 4, size=len(pool)), t, p
+    ),
+    # one worker process per shard
+    "sharded-workers": lambda pool, t, p: ShardedMatchmaker(
+        pool, np.random.randint(0, 4, size=len(pool)), t, p, workers=4
+    ),
+    "queue": QueueRounds,
+    "party": PartyRounds,
+}
+
+
+def synthetic_queue(
+    n_players: int, center: float = 1500, spread: float = 500 / 3, deviation=50
+) -> List[Glicko2Player]:
+    """Players with a normally distributed rating"""
+    ratings = np.random.normal(center, spread, size=n_players).tolist()
+    return [Glicko2Player(r, deviation, 0.06) for r in ratings]
+
+
+def _percentiles(values, prefix) -> Dict[str, float]:
+    if len(values) == 0:
+        values = [0]
+
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        f"{prefix}_mean": float(np.mean(values)),
+        f"{prefix}_p50": float(p50),
+        f"{prefix}_p90": float(p90),
+        f"{prefix}_p99": float(p99),
+        f"{prefix}_max": float(np.max(values)),
+    }
+
+
+def _team_difference(pool, matches: List[MatchMakerMatch]) -> List[float]:
+    """Difference between the strongest and the weakest team average rating"""
+    diff = []
+    for teams in matches:
+        strength = [sum(pool[pid].rating for pid in team) / len(team) for team in teams]
+        diff.append(max(strength) - min(strength))
+    return diff
+
+
+def benchmark(
+    factory: MatchmakerFactory,
+    n_players: int = 10_000,
+    rounds: int = 10,
+    n_team: int = 2,
+    n_players_per_team: int = 5,
+    drift: float = 25,
+) -> Dict[str, float]:
+    """Run a matchmaker for a few rounds and gather its metrics
+
+    Parameters
+    ----------
+    factory:
+        Builds the matchmaker from a pool of players, the number of teams and players per team
+
+    n_players:
+        Size of the queue
+
+    rounds:
+        Number of matchmaking rounds
+
+    drift:
+        Standard deviation of the rating change of the matched players after each round
+
+    Returns
+    -------
+    dictionary of metrics
+
+    * ``rounds_per_sec``: matchmaking rounds per second
+    * ``round_ms_*``: latency of a full round in milliseconds
+    * ``amortized_match_us_*``: latency of a round divided by the number of matches it made
+      in microseconds, matches are formed together so they are not timed individually
+    * ``wait_*``: number of rounds a player waited before being matched
+    * ``queued_wait_*``: number of rounds waited so far by the players still in queue at the end,
+      their wait is not over so they are not included in ``wait_*``
+    * ``queued``: fraction of the queue still waiting at the end
+    * ``team_diff_*``: rating difference between the strongest and the weakest team of a match
+    * ``utilization``: fraction of the queue matched each round
+
+    """
+    pool = synthetic_queue(n_players)
+    mm = factory(pool, n_team, n_players_per_team)
+
+    wait = np.zeros(n_players, dtype=np.int64)
+    waited = []
+    round_times = []
+    amortized_times = []
+    team_diff = []
+    utilization = []
+
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            matches = mm.matches()
+            elapsed = time.perf_counter() - start
+
+            matched = np.asarray(
+                [pid for teams in matches for team in teams for pid in team],
+                dtype=np.int64,
+            )
+
+            round_times.append(elapsed * 1e3)
+            amortized_times.append(elapsed * 1e6 / max(len(matches), 1))
+            team_diff.extend(_team_difference(pool, matches))
+            utilization.append(len(matched) / n_players)
+
+            waited.append(wait[matched])
+            wait += 1
+            wait[matched] = 0
+
+            # rating updates
+            for pid, delta in zip(
+                matched.tolist(), np.random.normal(0, drift, size=len(matched))
+            ):
+                pool[pid].rating += delta
+    finally:
+        close = getattr(mm, "close", None)
+        if close is not None:
+            close()
+
+    metrics = dict(rounds_per_sec=1e3 * len(round_times) / sum(round_times))
+    metrics.update(_percentiles(round_times, "round_ms"))
+    metrics.update(_percentiles(amortized_times, "amortized_match_us"))
+    metrics.update(_percentiles(np.concatenate(waited), "wait"))
+    metrics.update(_percentiles(wait[wait > 0], "queued_wait"))
+    metrics["queued"] = float(np.mean(wait > 0))
+    metrics.update(_percentiles(team_diff, "team_diff"))
+    metrics["utilization"] = float(np.mean(utilization))
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--teams", type=int, default=2)
+    parser.add_argument("--team-size", type=int, default=5)
+    parser.add_argument(
+        "--matchmaker", nargs="+", default=list(matchmakers), choices=list(matchmakers)
+    )
+    args = parser.parse_args(argv)
+
+    for n_players in args.players:
+        for name in args.matchmaker:
+            print(f"{name} ({n_players} players)")
+            print("=" * (len(name) + len(str(n_players)) + 11))
+
+            metrics = benchmark(
+                matchmakers[name], n_players, args.rounds, args.teams, args.team_size
+            )
+            for k, v in metrics.items():
+                print(f"{k:>30}: {v:.4f}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ranked.matchmaker import MatchMakerMatch
+from ranked.models import Player
+
+
+class SizeIndex:
+    """Parties of a given size sorted by skill, taken parties are skipped
+    using union-find style pointers so each lookup is amortized O(1)
+    """
+
+    def __init__(self, parties: np.ndarray, skills: np.ndarray) -> None:
+        order = np.argsort(skills, kind="stable")
+        self.parties = parties[order].tolist()
+        self.skills = skills[order]
+        self.position = {party: i for i, party in enumerate(self.parties)}
+
+        n = len(self.parties)
+        # next available position on the right/left of each position
+        self.right = list(range(n + 1))
+        self.left = list(range(n + 1))
+
+    def _find(self, pointers, i):
+        root = i
+        while pointers[root] != root:
+            root = pointers[root]
+
+        # path compression
+        while pointers[i] != root:
+            pointers[i], i = root, pointers[i]
+
+        return root
+
+    def find_right(self, i):
+        return self._find(self.right, i)
+
+    def find_left(self, i):
+        # left is shifted by one so -1 can be represented
+        return self._find(self.left, i + 1) - 1
+
+    def take(self, i):
+        self.right[i] = i + 1
+        self.left[i + 1] = i
+
+    def nearest(self, target, window, taken):
+        """Returns the position of the closest available party that is not in ``taken``"""
+        pos = int(np.searchsorted(self.skills, target))
+        n = len(self.parties)
+
+        lo = self.find_left(pos - 1)
+        hi = self.find_right(pos)
+
+        while lo >= 0 or hi < n:
+            dlo = target - self.skills[lo] if lo >= 0 else np.inf
+            dhi = self.skills[hi] - target if hi < n else np.inf
+
+            if min(dlo, dhi) > window:
+                return None
+
+            if dlo <= dhi:
+                if lo not in taken:
+                    return lo
+                lo = self.find_left(lo - 1)
+            else:
+                if hi not in taken:
+                    return hi
+                hi = self.find_right(hi + 1)
+
+        return None
+
+
+class PartyMatchmaker:
+    """Matchmaker keeping premade groups together.
+
+    Parties are indivisible, their skill is the average skill of their members.
+    Each round, parties are taken in skill order as anchors and the lobby is filled with
+    the closest parties, looked up in one skill index per party size, that still fit
+    in the team with the most room. Each party goes to the weakest team that can hold it
+    and a swap pass between parties of the same size then balances the teams.
+
+    Matched parties leave the queue, the others are kept for the next round.
+
+    Parameters
+    ----------
+    pool:
+        List of players
+
+    n_team:
+        Number of teams per match
+
+    n_players:
+        Number of players per team
+
+    window:
+        Maximum skill difference between the anchor party and the other parties of the lobby
+
+    steps:
+        Maximum number of balancing swaps per lobby
+
+    """
+
+    def __init__(
+        self,
+        pool: List[Player],
+        n_team: int = 2,
+        n_players: int = 5,
+        window: float = np.inf,
+        steps: int = 2,
+    ) -> None:
+        self.players = pool
+        self.n_team = n_team
+        self.n_players = n_players
+        self.n_player_match = n_team * n_players
+        self.window = window
+        self.steps = steps
+
+        self.parties: Dict[int, List[int]] = dict()
+        self.party_count = 0
+
+    def add_party(self, members: Sequence[int]) -> int:
+        """Queue a group of players that need to be in the same team"""
+        if not 0 < len(members) <= self.n_players:
+            raise ValueError(
+                f"Party size must be between 1 and {self.n_players} got {len(members)}"
+            )
+
+        party = self.party_count
+        self.party_count += 1
+        self.parties[party] = list(members)
+        return party
+
+    def remove_party(self, party: int) -> None:
+        self.parties.pop(party, None)
+
+    def _index(self):
+        """Skill index of the queued parties, it is rebuilt each round
+        because the skill of the waiting players can change between rounds
+        """
+        parties = np.fromiter(self.parties.keys(), dtype=np.int64)
+        sizes = np.fromiter((len(m) for m in self.parties.values()), dtype=np.int64)
+        skills = np.fromiter(
+            (
+                sum(self.players[pid].skill() for pid in m) / len(m)
+                for m in self.parties.values()
+            ),
+            dtype=np.float64,
+            count=len(parties),
+        )
+
+        index = {
+            size: SizeIndex(parties[sizes == size], skills[sizes == size])
+            for size in range(1, self.n_players + 1)
+        }
+        return (
+            parties[np.argsort(skills, kind="stable")],
+            dict(zip(parties.tolist(), skills.tolist())),
+            index,
+        )
+
+    def _lobby(self, anchor, skills, index) -> Optional[List[List[int]]]:
+        """Fill a lobby around the anchor party, returns the parties of each team"""
+        size = len(self.parties[anchor])
+        target = skills[anchor]
+
+        capacity = [self.n_players] * self.n_team
+        strength = [0.0] * self.n_team
+        teams: List[List[int]] = [[] for _ in range(self.n_team)]
+        taken = {size: {index[size].position[anchor]}}
+
+        def place(party, party_size):
+            team = min(
+                (t for t in range(self.n_team) if capacity[t] >= party_size),
+                key=lambda t: strength[t],
+            )
+            teams[team].append(party)
+            capacity[team] -= party_size
+            strength[team] += skills[party] * party_size
+
+        place(anchor, size)
+
+        while max(capacity) > 0:
+            room = max(capacity)
+
+            # closest party among the sizes that still fit
+            best = None
+            for size in range(room, 0, -1):
+                pos = index[size].nearest(
+                    target, self.window, taken.setdefault(size, set())
+                )
+                if pos is None:
+                    continue
+
+                distance = abs(index[size].skills[pos] - target)
+                if best is None or distance < best[0]:
+                    best = (distance, size, pos)
+
+            if best is None:
+                return None
+
+            _, party_size, pos = best
+
+            taken[party_size].add(pos)
+            place(index[party_size].parties[pos], party_size)
+
+        for party_size, positions in taken.items():
+            for pos in positions:
+                index[party_size].take(pos)
+
+        return self._balance(teams, skills)
+
+    def _balance(self, teams, skills):
+        """Swap parties of the same size between the strongest and the weakest team"""
+
+        def strength(team):
+            return sum(skills[p] * len(self.parties[p]) for p in team)
+
+        for _ in range(self.steps):
+            sums = [strength(team) for team in teams]
+            hi = max(range(self.n_team), key=lambda t: sums[t])
+            lo = min(range(self.n_team), key=lambda t: sums[t])
+            diff = sums[hi] - sums[lo]
+
+            best, swap = diff, None
+            for i, x in enumerate(teams[hi]):
+                for j, y in enumerate(teams[lo]):
+                    if len(self.parties[x]) != len(self.parties[y]):
+                        continue
+
+                    delta = (skills[x] - skills[y]) * len(self.parties[x])
+                    new_diff = abs(diff - 2 * delta)
+
+                    if new_diff < best - 1e-12:
+                        best, swap = new_diff, (i, j)
+
+            if swap is None:
+                break
+
+            i, j = swap
+            teams[hi][i], teams[lo][j] = teams[lo][j], teams[hi][i]
+
+        return teams
+
+    def matches(self) -> List[MatchMakerMatch]:
+        if not self.parties:
+            return []
+
+        order, skills, index = self._index()
+        batch: List[MatchMakerMatch] = []
+
+        for anchor in order.tolist():
+            # anchor was already used in a lobby
+            if anchor not in self.parties:
+                continue
+
+            teams = self._lobby(anchor, skills, index)
+            if teams is None:
+                continue
+
+            batch.append(
+                [
+                    [pid for party in team for pid in self.parties[party]]
+                    for team in teams
+                ]
+            )
+
+            for team in teams:
+                for party in team:
+                    del self.parties[party]
+
+        return batch
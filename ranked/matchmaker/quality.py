@@ -0,0 +1,168 @@
+from typing import List, Optional
+
+import numpy as np
+
+from ranked.matchmaker import Matchmaker, MatchMakerMatch
+from ranked.matchmaker.balance import partition, shuffle_teams, team_members
+from ranked.models import Player, Ranker
+from ranked.utils.arrays import grow
+
+
+class QualityMatchmaker(Matchmaker):
+    """Generate overlapping candidate lobbies along the skill index, score them all
+    with the ranker's :meth:`~ranked.models.Ranker.quality_batch` and keep the
+    disjoint set of lobbies with the best total quality.
+
+    Parameters
+    ----------
+    pool:
+        List of players
+
+    ranker:
+        Ranker used to score the candidate lobbies
+
+    n_team:
+        Number of teams per match
+
+    n_players:
+        Number of players per team
+
+    balance:
+        Method used to split the players of a lobby into teams
+
+    stride:
+        Distance between two candidate lobbies in the skill index,
+        must divide the number of players per match; defaults to half a lobby
+
+    min_quality:
+        Lobbies below this quality are not played
+
+    coverage:
+        Bonus given to each selected lobby, a large bonus favors matching
+        as many players as possible over picking the fairest lobbies
+
+    priority:
+        Bonus given to a lobby per round waited by its players on average,
+        favors lobbies with players that were left out in the previous rounds
+
+    """
+
+    def __init__(
+        self,
+        pool: List[Player],
+        ranker: Ranker,
+        n_team: int = 2,
+        n_players: int = 5,
+        balance: str = "kk",
+        stride: Optional[int] = None,
+        min_quality: float = 0,
+        coverage: float = 1,
+        priority: float = 0,
+    ) -> None:
+        super().__init__(pool, n_team, n_players, balance)
+        self.ranker = ranker
+        self.stride = stride or max(self.n_player_match // 2, 1)
+        self.min_quality = min_quality
+        self.coverage = coverage
+        self.priority = priority
+        self.variances = np.zeros(len(pool), dtype=np.float64)
+
+        assert self.n_player_match % self.stride == 0
+
+    def refresh(self) -> None:
+        if self._dirty:
+            dirty = np.concatenate(self._dirty)
+            dirty = dirty[self.active[dirty]]
+
+            self.variances = grow(self.variances, len(self.players))
+            self.variances[dirty] = np.fromiter(
+                (self.players[pid].consistency() for pid in dirty.tolist()),
+                dtype=np.float64,
+                count=len(dirty),
+            )
+            self.variances[dirty] **= 2
+
+        super().refresh()
+
+    def candidates(self):
+        """Build every candidate lobbies and their quality
+
+        Returns
+        -------
+        index of the first player of each lobby, the teams (lobby, players) and their quality
+        """
+        n = len(self.players_pid)
+        size = self.n_player_match
+
+        starts = np.arange(0, n - size + 1, self.stride)
+        positions = starts[:, None] + np.arange(size)[None, :]
+
+        skills = self.skills[positions]
+        variances = self.variances[self.players_pid[positions]]
+
+        teams = partition(skills, self.n_team, self.balance)
+
+        # team aggregates: (lobby, team)
+        mu = np.stack(
+            [np.where(teams == t, skills, 0).sum(axis=1) for t in range(self.n_team)], 1
+        )
+        var = np.stack(
+            [
+                np.where(teams == t, variances, 0).sum(axis=1)
+                for t in range(self.n_team)
+            ],
+            1,
+        )
+        quality = self.ranker.quality_batch(mu, var, self.n_players)
+        return starts, teams, quality
+
+    def select(
+        self, quality: np.ndarray, wait: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """Pick the set of non overlapping lobbies with the highest total score
+        (weighted interval scheduling on lobbies of equal length)
+        """
+        step = self.n_player_match // self.stride
+        bonus = self.coverage
+        if wait is not None:
+            bonus = bonus + self.priority * wait
+
+        score = np.where(quality >= self.min_quality, quality + bonus, -1)
+        score = score.tolist()
+        n = len(score)
+
+        # best[i] best total using candidates i and after
+        best = [0.0] * (n + step + 1)
+        for i in range(n - 1, -1, -1):
+            best[i] = max(best[i + 1], score[i] + best[i + step])
+
+        selected = []
+        i = 0
+        while i < n:
+            if score[i] > 0 and score[i] + best[i + step] >= best[i + 1]:
+                selected.append(i)
+                i += step
+            else:
+                i += 1
+
+        return selected
+
+    def matches(self) -> List[MatchMakerMatch]:
+        self.refresh()
+
+        if len(self.players_pid) < self.n_player_match:
+            return []
+
+        starts, teams, quality = self.candidates()
+
+        positions = starts[:, None] + np.arange(self.n_player_match)[None, :]
+        wait = self.wait[self.players_pid[positions]].mean(axis=1)
+        selected = self.select(quality, wait)
+
+        pool = self.players_pid[positions[selected]]
+        teams = shuffle_teams(teams[selected], self.n_team)
+
+        self.matched(pool)
+
+        assert self.first_player is self.players[0]
+        return team_members(pool, teams, self.n_team).tolist()
@@ -0,0 +1,307 @@
+import asyncio
+import math
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set
+
+from ranked.matchmaker import MatchMakerMatch
+from ranked.matchmaker.balance import balance_lobby
+
+
+class QueueEntry:
+    """A player waiting in the queue"""
+
+    __slots__ = ("pid", "skill", "uncertainty", "joined", "bucket", "retry")
+
+    def __init__(self, pid, skill, uncertainty, joined, bucket) -> None:
+        self.pid = pid
+        self.skill = skill
+        self.uncertainty = uncertainty
+        self.joined = joined
+        self.bucket = bucket
+        # time at which the search window will have grown enough to be worth a retry
+        self.retry = joined
+
+
+class QueueMatchmaker:
+    """Match players as they join the queue instead of matching the whole pool at once.
+
+    Waiting players are indexed by skill buckets, each player accepts opponents
+    inside a window that starts wide for uncertain players and widens the longer they wait.
+    A match is emitted as soon as enough players accept each other.
+
+    Parameters
+    ----------
+    n_team:
+        Number of teams per match
+
+    n_players:
+        Number of players per team
+
+    window:
+        Initial half width of the skill window
+
+    widen:
+        Window increase per second of wait
+
+    max_window:
+        Upper bound of the window
+
+    uncertainty:
+        Factor applied to the player uncertainty (i.e. skill deviation)
+        to widen its window, uncertain players do not need tight matches.
+        The index is on skill only, the window of each candidate is checked when it is found
+
+    bucket:
+        Width of the skill buckets used to index the queue, defaults to ``window``
+
+    balance_steps:
+        Number of local search steps used to balance the teams,
+        see :func:`ranked.matchmaker.balance.balance_lobby`
+
+    clock:
+        Function returning the current time in seconds
+
+    Examples
+    --------
+
+    >>> mm = QueueMatchmaker(n_team=2, n_players=1, window=10)
+    >>> mm.join(0, 1500)
+    >>> mm.join(1, 1505)
+    [[1], [0]]
+
+    """
+
+    def __init__(
+        self,
+        n_team: int = 2,
+        n_players: int = 5,
+        window: float = 50,
+        widen: float = 10,
+        max_window: float = 500,
+        uncertainty: float = 1,
+        bucket: Optional[float] = None,
+        balance_steps: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.n_team = n_team
+        self.n_players = n_players
+        self.n_player_match = n_team * n_players
+
+        self.window = window
+        self.widen = widen
+        self.max_window = max_window
+        self.uncertainty = uncertainty
+        self.bucket = bucket or window
+        self.balance_steps = balance_steps
+        self.clock = clock
+
+        # dict keeps the join order, older players are retried first
+        self.waiting: Dict[int, QueueEntry] = dict()
+        self.buckets: Dict[int, Set[int]] = defaultdict(set)
+
+        self.output: Optional[asyncio.Queue] = None
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    def search_window(self, entry: QueueEntry, now: float) -> float:
+        """Half width of the skill window of a waiting player"""
+        w = (
+            self.window
+            + self.uncertainty * entry.uncertainty
+            + self.widen * (now - entry.joined)
+        )
+        return min(w, self.max_window)
+
+    def join(self, pid, skill, uncertainty=0) -> Optional[MatchMakerMatch]:
+        """Add a player to the queue, returns a match if one could be made"""
+        now = self.clock()
+
+        if pid in self.waiting:
+            self.leave(pid)
+
+        entry = QueueEntry(pid, skill, uncertainty, now, int(skill // self.bucket))
+        self.waiting[pid] = entry
+        self.buckets[entry.bucket].add(pid)
+
+        return self._match(entry, now)
+
+    def leave(self, pid) -> bool:
+        """Remove a player from the queue, returns False if the player was not waiting"""
+        entry = self.waiting.pop(pid, None)
+
+        if entry is None:
+            return False
+
+        players = self.buckets[entry.bucket]
+        players.discard(pid)
+
+        if not players:
+            del self.buckets[entry.bucket]
+
+        return True
+
+    def tick(self) -> List[MatchMakerMatch]:
+        """Retry the players whose window widened since their last attempt"""
+        now = self.clock()
+        matches = []
+
+        for entry in list(self.waiting.values()):
+            if entry.retry > now or entry.pid not in self.waiting:
+                continue
+
+            match = self._match(entry, now)
+            if match is not None:
+                matches.append(match)
+
+        return matches
+
+    def _candidates(self, entry: QueueEntry, now: float) -> List[QueueEntry]:
+        """Find the closest players that accept the given player and that it accepts"""
+        need = self.n_player_match - 1
+        window = self.search_window(entry, now)
+        reach = int(math.ceil(window / self.bucket))
+
+        candidates = []
+        selected = []
+        for ring in range(reach + 1):
+            for bucket in {entry.bucket - ring, entry.bucket + ring}:
+                for pid in self.buckets.get(bucket, ()):
+                    other = self.waiting[pid]
+
+                    if other is entry:
+                        continue
+
+                    distance = abs(other.skill - entry.skill)
+                    if distance <= window and distance <= self.search_window(
+                        other, now
+                    ):
+                        candidates.append((distance, other))
+
+            candidates.sort(key=lambda item: item[0])
+            selected = self._select(entry, candidates, now, need)
+
+            # players of the next ring are at least ``ring * bucket`` away
+            if len(selected) == need and selected[-1][0] <= ring * self.bucket:
+                break
+
+        return [other for _, other in selected]
+
+    def _select(self, entry: QueueEntry, candidates, now: float, need: int):
+        """Keep the closest candidates while the skill range of the lobby
+        fits inside the window of every member, so all the players accept each other
+        """
+        lo = hi = entry.skill
+        smallest = self.search_window(entry, now)
+        selected = []
+
+        for distance, other in candidates:
+            new_lo = min(lo, other.skill)
+            new_hi = max(hi, other.skill)
+            new_smallest = min(smallest, self.search_window(other, now))
+
+            if new_hi - new_lo > new_smallest:
+                continue
+
+            lo, hi, smallest = new_lo, new_hi, new_smallest
+            selected.append((distance, other))
+
+            if len(selected) == need:
+                break
+
+        return selected
+
+    def _match(self, entry: QueueEntry, now: float) -> Optional[MatchMakerMatch]:
+        candidates = self._candidates(entry, now)
+
+        if len(candidates) < self.n_player_match - 1:
+            # the window grows by a bucket every bucket / widen seconds
+            if self.widen > 0:
+                entry.retry = now + self.bucket / self.widen
+            else:
+                entry.retry = math.inf
+            return None
+
+        lobby = [entry] + candidates
+        for other in lobby:
+            self.leave(other.pid)
+
+        # matches are produced one at a time, numpy overhead would dominate
+        skills = [other.skill for other in lobby]
+        assignment = balance_lobby(skills, self.n_team, self.balance_steps)
+
+        teams: MatchMakerMatch = [[] for _ in range(self.n_team)]
+        for other, team in zip(lobby, assignment):
+            teams[team].append(other.pid)
+
+        return teams
+
+    def _emit(self, match: Optional[MatchMakerMatch]) -> None:
+        if match is not None and self.output is not None:
+            self.output.put_nowait(match)
+
+    def process(self, event) -> Optional[MatchMakerMatch]:
+        """Apply a queue event, ``("join", pid, skill, uncertainty)`` or ``("leave", pid)``
+
+        Returns the match made by the event, it is also pushed to ``self.output`` when :meth:`run` is used
+        """
+        kind = event[0]
+        match = None
+
+        if kind == "join":
+            match = self.join(*event[1:])
+
+        elif kind == "leave":
+            self.leave(event[1])
+
+        else:
+            raise ValueError(f"Unknown queue event {kind}")
+
+        self._emit(match)
+        return match
+
+    async def run(self, events: asyncio.Queue, interval: float = 0.1) -> None:
+        """Consume queue events until ``None`` is received,
+        matches are pushed to ``self.output`` as soon as they are found
+
+        Parameters
+        ----------
+        events:
+            queue of join/leave events
+
+        interval:
+            time in seconds between two retries of the waiting players
+
+        """
+        if self.output is None:
+            self.output = asyncio.Queue()
+
+        next_tick = self.clock() + interval
+
+        while True:
+            # drain every pending events without yielding to the loop
+            while not events.empty():
+                event = events.get_nowait()
+
+                if event is None:
+                    return
+
+                self.process(event)
+
+            now = self.clock()
+            if now >= next_tick:
+                for match in self.tick():
+                    self._emit(match)
+
+                next_tick = now + interval
+
+            try:
+                event = await asyncio.wait_for(events.get(), max(next_tick - now, 0))
+            except asyncio.TimeoutError:
+                continue
+
+            if event is None:
+                return
+
+            self.process(event)
@@ -0,0 +1,227 @@
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ranked.matchmaker import MatchMakerMatch
+from ranked.matchmaker.balance import partition, shuffle_teams, team_members
+from ranked.models import Player
+from ranked.utils.arrays import capacity, grow
+from ranked.utils.shared import allocate, attach
+
+
+def match_pool(
+    pids: np.ndarray, skills: np.ndarray, n_team: int, n_players: int, balance: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort a pool of players by skill, cut it into matches and balance the teams
+
+    Returns
+    -------
+    the teams of each match (match, team, players) and the players left out
+    """
+    n_player_match = n_team * n_players
+    n_matches = len(pids) // n_player_match
+    n_matched = n_matches * n_player_match
+
+    order = np.argsort(skills, kind="stable")
+    pids = pids[order]
+    skills = skills[order]
+
+    matched = pids[:n_matched].reshape(n_matches, n_player_match)
+    teams = partition(
+        skills[:n_matched].reshape(n_matches, n_player_match), n_team, balance
+    )
+    return np.stack([matched, teams], axis=0), pids[n_matched:]
+
+
+def _match_bucket(name, size, key, pids, n_team, n_players, balance):
+    """Worker entry point, reads the skills from shared memory"""
+    skills = attach(name, (size,), np.float64, key)
+    return match_pool(pids, skills[pids], n_team, n_players, balance)
+
+
+class ShardedMatchmaker:
+    """Split the pool in buckets (e.g. region or game mode) and match each bucket
+    in parallel, skills are shared with the workers through shared memory.
+
+    Players left out of their bucket can be backfilled together in a final cross-bucket pass.
+
+    Parameters
+    ----------
+    pool:
+        List of players
+
+    buckets:
+        Bucket of each player
+
+    n_team:
+        Number of teams per match
+
+    n_players:
+        Number of players per team
+
+    balance:
+        Method used to split the players of a match into teams
+
+    workers:
+        Number of worker processes, 0 matches every bucket in the current process
+
+    backfill:
+        Match the leftover players of every bucket together
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        with ShardedMatchmaker(pool, regions, workers=8) as mm:
+            for _ in range(rounds):
+                matches = mm.matches()
+
+    """
+
+    def __init__(
+        self,
+        pool: List[Player],
+        buckets: Sequence[int],
+        n_team: int = 2,
+        n_players: int = 5,
+        balance: str = "kk",
+        workers: int = 0,
+        backfill: bool = True,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.players = pool
+        self.n_team = n_team
+        self.n_players = n_players
+        self.n_player_match = n_team * n_players
+        self.balance = balance
+        self.backfill = backfill
+
+        # arrays have a capacity larger than the pool, only the first `size` are used
+        self.size = len(pool)
+        self.buckets = np.asarray(buckets, dtype=np.int64)
+        self.active = np.ones(len(pool), dtype=bool)
+        self.dirty = np.arange(len(pool))
+
+        # workers only keep the latest segment of this matchmaker attached
+        self.key = uuid.uuid4().hex
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.skills = np.zeros(0)
+        self.skills = self._allocate(len(pool))
+
+        self.executor = executor
+        if self.executor is None and workers > 0:
+            self.executor = ProcessPoolExecutor(workers)
+
+    def _allocate(self, size) -> np.ndarray:
+        """Shared skills array able to hold ``size`` players, the segment is only
+        replaced when the capacity is exceeded
+        """
+        if self.shm is not None and size <= len(self.skills):
+            return self.skills
+
+        old = self.shm
+        self.shm, skills = allocate((capacity(len(self.skills), size),), np.float64)
+
+        if old is not None:
+            skills[: len(self.skills)] = self.skills
+            del self.skills
+            old.close()
+            old.unlink()
+
+        return skills
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+        if self.shm is not None:
+            del self.skills
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def add_players(self, players: Sequence[Player], buckets: Sequence[int]):
+        """Append new players to the pool, returns their ids"""
+        start = self.size
+        self.players.extend(players)
+        end = self.size = len(self.players)
+
+        self.skills = self._allocate(end)
+        self.buckets = grow(self.buckets, end)
+        self.active = grow(self.active, end)
+        self.buckets[start:end] = buckets
+        self.active[start:end] = True
+        self.mark_dirty(np.arange(start, end))
+        return list(range(start, end))
+
+    def remove_players(self, pids: Sequence[int]) -> None:
+        self.active[np.asarray(pids, dtype=np.int64)] = False
+
+    def mark_dirty(self, pids) -> None:
+        self.dirty = np.concatenate([self.dirty, np.asarray(pids, dtype=np.int64)])
+
+    def refresh(self) -> None:
+        """Write the skill of the players that changed to shared memory"""
+        dirty = np.unique(self.dirty)
+        self.skills[dirty] = np.fromiter(
+            (self.players[pid].skill() for pid in dirty.tolist()),
+            dtype=np.float64,
+            count=len(dirty),
+        )
+        self.dirty = dirty[:0]
+
+    def _shards(self) -> List[np.ndarray]:
+        pids = np.flatnonzero(self.active[: self.size])
+        buckets = self.buckets[pids]
+
+        order = np.argsort(buckets, kind="stable")
+        pids = pids[order]
+        splits = np.flatnonzero(np.diff(buckets[order])) + 1
+        return np.split(pids, splits)
+
+    def matches(self) -> List[MatchMakerMatch]:
+        self.refresh()
+
+        args = (self.n_team, self.n_players, self.balance)
+        shards = self._shards()
+
+        if self.executor is None:
+            results = [match_pool(p, self.skills[p], *args) for p in shards]
+        else:
+            futures = [
+                self.executor.submit(
+                    _match_bucket, self.shm.name, len(self.skills), self.key, p, *args
+                )
+                for p in shards
+            ]
+            results = [future.result() for future in futures]
+
+        matched = [result for result, _ in results]
+        leftovers = [leftover for _, leftover in results]
+
+        if self.backfill and leftovers:
+            leftover = np.concatenate(leftovers)
+            result, _ = match_pool(leftover, self.skills[leftover], *args)
+            matched.append(result)
+
+        matched = [m for m in matched if m.shape[1] > 0]
+        if not matched:
+            return []
+
+        pids, teams = np.concatenate(matched, axis=1)
+        teams = shuffle_teams(teams, self.n_team)
+
+        # matched players are going to get their skill updated
+        self.mark_dirty(pids.ravel())
+        return team_members(pids, teams, self.n_team).tolist()
@@ -1,8 +1,7 @@
 import copy
+import importlib
 from typing import Sequence, Union
 
-from ranked.utils import fetch_factories
-
 
 class Player:
     def skill(self) -> float:
@@ -18,6 +17,12 @@ class Player:
     def to_json(self):
         return dict(skill=self.skill(), cons=self.consistency())
 
+    def state(self) -> Sequence[float]:
+        """Arguments of ``Ranker.new_player`` that recreate this player,
+        used to send players to other processes as arrays
+        """
+        raise NotImplementedError()
+
 
 class Team(Player):
     """Combine multiple players and make them look like one to the ranking algorithm.
@@ -131,6 +136,10 @@ class Batch:
 
 
 class Ranker:
+    # True when the ranker keeps state across matches (e.g. the match history),
+    # matches cannot be updated on separate copies of the ranker
+    stateful = False
+
     @staticmethod
     def parameters(self, center) -> dict:
         """Returns a dictionary of hyperparameter to be tuned"""
@@ -148,6 +157,24 @@ class Ranker:
         """Returns the win probability"""
         raise NotImplementedError()
 
+    def quality_batch(self, mu, var, size):
+        """Returns the quality of many candidate matches at once,
+        1 being a perfectly fair match
+
+        Parameters
+        ----------
+        mu: array (match, team)
+            sum of the estimated skill of the team members
+
+        var: array (match, team)
+            sum of the squared consistency of the team members
+
+        size: array (match, team)
+            number of players in each team
+
+        """
+        raise NotImplementedError()
+
     def update(self, matches: Union[Batch, Match]) -> None:
         """Update rank of each players for a given score
 
@@ -171,14 +198,29 @@ class Ranker:
             self.update_match(match)
 
 
-registered_models = fetch_factories("ranked.models", __file__, "make")
+# Module defining the ``make`` function of each model,
+# modules are only imported when the model is built
+registered_models = {
+    "bradleyterry": "ranked.models.bradleyterry",
+    "elo": "ranked.models.elo",
+    "elochess": "ranked.models.elochess",
+    "glicko2": "ranked.models.glicko2",
+    "noskill": "ranked.models.noskill",
+    "openskill": "ranked.models.openskill",
+    "whr": "ranked.models.whr",
+}
+
+
+def register(name: str, module: str) -> None:
+    """Register a model, ``module`` needs to define a ``make`` function"""
+    registered_models[name] = module
 
 
 def make(name, *args, **kwargs) -> Ranker:
     """Builds the requested Ranker"""
-    ctor = registered_models.get(name)
+    module = registered_models.get(name)
 
-    if ctor is None:
+    if module is None:
         raise RuntimeError(f"Ranker {name} was not defined")
 
-    return ctor(*args, **kwargs)
+    return importlib.import_module(module).make(*args, **kwargs)
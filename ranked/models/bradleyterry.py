@@ -0,0 +1,299 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import log_ndtr, ndtr
+
+from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.arrays import pad_matches
+from ranked.utils.quality import pairwise_quality
+
+
+class BradleyTerryPlayer(Player):
+    def __init__(self, mu=1500, *args) -> None:
+        self.mu = mu
+
+    def skill(self) -> float:
+        return self.mu
+
+
+class BradleyTerryTeam(Team):
+    def skill(self) -> float:
+        return sum(p.skill() for p in self.players)
+
+
+def design_matrix(
+    teams: np.ndarray, scores: np.ndarray, n_players: int
+) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Build the sparse comparison matrix of a set of matches
+
+    Every pair of teams of a match is one comparison (row), members of the first team
+    have a coefficient of ``+1`` and members of the second team ``-1``
+    so the row times the ratings is the difference of the team ratings.
+
+    Parameters
+    ----------
+    teams:
+        player ids of shape ``(match, team, players)`` padded with ``-1``
+
+    scores:
+        score of each team, shape ``(match, team)``, missing teams are ``nan``
+
+    Returns
+    -------
+    the design matrix of shape ``(comparisons, players)`` and the result of each comparison
+    (1 the first team won, 0.5 draw, 0 loss)
+    """
+    n_match, n_team, n_size = teams.shape
+    a, b = np.triu_indices(n_team, k=1)
+
+    # (match, pair)
+    valid = ~(np.isnan(scores[:, a]) | np.isnan(scores[:, b]))
+    outcome = (np.sign(scores[:, a] - scores[:, b]) + 1) / 2
+
+    match, pair = np.nonzero(valid)
+    rows = np.arange(len(match))
+
+    # (comparison, 2 * players)
+    members = np.concatenate([teams[match, a[pair]], teams[match, b[pair]]], axis=1)
+    signs = np.repeat([1.0, -1.0], n_size)[None, :].repeat(len(match), axis=0)
+    mask = members >= 0
+
+    X = sparse.csr_matrix(
+        (signs[mask], (np.repeat(rows, 2 * n_size)[mask.ravel()], members[mask])),
+        shape=(len(match), n_players),
+    )
+    return X, outcome[match, pair]
+
+
+def fit(
+    X: sparse.spmatrix,
+    y: np.ndarray,
+    x0: np.ndarray,
+    center: float = 1500,
+    scale: float = 173.7178,
+    prior: float = 350,
+    model: str = "logistic",
+    maxiter: int = 100,
+) -> np.ndarray:
+    """Maximum a posteriori ratings of a Bradley-Terry (logistic) or Thurstone (probit) model
+
+    A gaussian prior centered on ``center`` keeps the problem well posed
+    for players with few matches or that never lost.
+
+    Parameters
+    ----------
+    X:
+        design matrix, see :func:`design_matrix`
+
+    y:
+        result of each comparison
+
+    x0:
+        starting ratings (warm start)
+
+    """
+    y = np.asarray(y, dtype=np.float64)
+    precision = 1 / prior**2
+    Xt = X.T.tocsr()
+
+    if model == "logistic":
+
+        def log_cdf(z):
+            return -np.logaddexp(0, -z)
+
+        def ratio(z):
+            # d/dz log F(z)
+            return 1 / (1 + np.exp(z))
+
+    elif model == "probit":
+
+        def log_cdf(z):
+            return log_ndtr(z)
+
+        def ratio(z):
+            return np.exp(-(z**2) / 2 - math.log(math.sqrt(2 * math.pi)) - log_ndtr(z))
+
+    else:
+        raise ValueError(f"Unknown model {model}")
+
+    def objective(ratings):
+        z = (X @ ratings) / scale
+        diff = ratings - center
+
+        loss = -(y * log_cdf(z) + (1 - y) * log_cdf(-z)).sum()
+        loss += 0.5 * precision * diff @ diff
+
+        dz = -(y * ratio(z) - (1 - y) * ratio(-z))
+        grad = (Xt @ dz) / scale + precision * diff
+        return loss, grad
+
+    result = minimize(
+        objective,
+        np.asarray(x0, dtype=np.float64),
+        jac=True,
+        method="L-BFGS-B",
+        options=dict(maxiter=maxiter),
+    )
+    return result.x
+
+
+class BradleyTerry(Ranker):
+    """Offline ranker fitting the ratings on the whole match history at once.
+
+    The win probability of a team is ``F((R_a - R_b) / scale)`` where ``R`` is the sum of the
+    ratings of the team members and ``F`` the logistic (Bradley-Terry)
+    or the normal (Thurstone) cumulative distribution.
+    Matches with more than two teams are split into every pair of teams.
+
+    The ratings do not depend on the order of the matches,
+    each update adds the matches to the history and the ratings are refitted
+    on the whole history, starting from the current ones, every ``refit`` updates;
+    call :meth:`fit` to refit right away.
+
+    For large datasets use :func:`design_matrix` and :func:`fit` directly on the encoded matches.
+
+    Parameters
+    ----------
+    center:
+        Starting rating and center of the prior
+
+    scale:
+        Rating difference scale
+
+    prior:
+        Standard deviation of the prior on the ratings
+
+    model:
+        ``logistic`` (Bradley-Terry) or ``probit`` (Thurstone)
+
+    maxiter:
+        Maximum number of L-BFGS iterations per fit
+
+    refit:
+        Number of updates between two fits, a fit costs as much as the whole history
+        so refitting after every update is quadratic in the number of matches
+
+    """
+
+    stateful = True
+
+    def __init__(
+        self,
+        center: float = 1500,
+        scale: float = 173.7178,
+        prior: float = 350,
+        model: str = "logistic",
+        maxiter: int = 100,
+        refit: int = 10,
+    ) -> None:
+        self.center = center
+        self.scale = scale
+        self.prior = prior
+        self.model = model
+        self.maxiter = maxiter
+        self.refit = refit
+
+        self.players: List[BradleyTerryPlayer] = []
+        self.pids: Dict[int, int] = dict()
+
+        # recorded matches, (team, players) player ids and team scores
+        self.history: List[Tuple[List[List[int]], List[float]]] = []
+        # updates recorded since the last fit
+        self.pending = 0
+
+    def new_player(self, mu=None, *args) -> BradleyTerryPlayer:
+        return BradleyTerryPlayer(self.center if mu is None else mu)
+
+    def new_team(self, *players, **config) -> BradleyTerryTeam:
+        return BradleyTerryTeam(*players, **config)
+
+    def cdf(self, z):
+        if self.model == "logistic":
+            return 1 / (1 + np.exp(-z))
+        return ndtr(z)
+
+    def win(self, match: Match) -> float:
+        if len(match) == 2:
+            s1 = match.get_player(0).skill()
+            s2 = match.get_player(1).skill()
+            return float(self.cdf((s1 - s2) / self.scale))
+
+        raise NotImplementedError()
+
+    def quality_batch(self, mu, var, size):
+        return pairwise_quality(mu, var, lambda delta, _: self.cdf(delta / self.scale))
+
+    def _pid(self, player: Player) -> int:
+        pid = self.pids.get(id(player))
+
+        if pid is None:
+            pid = len(self.players)
+            self.pids[id(player)] = pid
+            self.players.append(player)
+
+        return pid
+
+    def record(self, matches: Batch) -> None:
+        """Add matches to the history without refitting"""
+        for match in matches:
+            teams = []
+            for team in match.teams:
+                members = list(team) if isinstance(team, Team) else [team]
+                teams.append([self._pid(p) for p in members])
+
+            self.history.append((teams, list(match.scores)))
+
+    def encode(self) -> Tuple[np.ndarray, np.ndarray]:
+        """History as padded arrays of player ids ``(match, team, players)``
+        and scores ``(match, team)``
+        """
+        matches = [teams for teams, _ in self.history]
+        scores = [scores for _, scores in self.history]
+
+        return pad_matches(matches, scores)
+
+    def fit(self, x0: Optional[np.ndarray] = None) -> np.ndarray:
+        """Fit the ratings on the whole history, warm started from the current ratings"""
+        if not self.history:
+            return np.zeros(0)
+
+        self.pending = 0
+
+        teams, scores = self.encode()
+        X, y = design_matrix(teams, scores, len(self.players))
+
+        if x0 is None:
+            x0 = np.fromiter((p.mu for p in self.players), dtype=np.float64)
+
+        ratings = fit(
+            X,
+            y,
+            x0,
+            center=self.center,
+            scale=self.scale,
+            prior=self.prior,
+            model=self.model,
+            maxiter=self.maxiter,
+        )
+
+        for p, mu in zip(self.players, ratings.tolist()):
+            p.mu = mu
+
+        return ratings
+
+    def update_match(self, match: Match) -> None:
+        self.update_batch(Batch(match))
+
+    def update_batch(self, matches: Batch) -> None:
+        self.record(matches)
+        self.pending += 1
+
+        if self.pending >= self.refit:
+            self.fit()
+
+
+def make(*args, **kwargs):
+    return BradleyTerry(*args, **kwargs)
@@ -1,8 +1,10 @@
 import math
+from typing import Callable, List
 
-from scipy.stats import norm
+import numpy as np
 
-from ranked.models import Match, Player, Ranker, Team
+from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.quality import pairwise_quality
 
 
 class EloPlayer(Player):
@@ -12,6 +14,9 @@ class EloPlayer(Player):
     def skill(self) -> float:
         return self.mu
 
+    def state(self):
+        return (self.mu,)
+
 
 class EloTeam(Team):
     """Combine multiple players and make them look like one to the algorithm"""
@@ -23,6 +28,9 @@ class EloTeam(Team):
     def skill(self) -> float:
         return self.mu
 
+    def reset(self):
+        self._mu = None
+
     @property
     def mu(self):
         if self._mu is None:
@@ -31,25 +39,242 @@ class EloTeam(Team):
 
     @mu.setter
     def mu(self, value):
-        diff = value - self.mu
+        mu = np.fromiter((p.mu for p in self.players), dtype=np.float64)
+        mu += (value - self.mu) * _share(mu, np.ones(len(mu), dtype=bool))
 
-        for p in self.players:
-            print(self, p, diff, p.skill() / self.mu)
-            p.mu += diff * (p.skill() / self.mu)
+        for p, v in zip(self.players, mu.tolist()):
+            p.mu = v
 
         self._mu = None
 
 
+def _share(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Share of each player in its team rating, even split when the team rating is 0"""
+    total = values.sum(axis=-1, keepdims=True)
+
+    # padding teams have no members
+    with np.errstate(divide="ignore", invalid="ignore"):
+        even = mask / mask.sum(axis=-1, keepdims=True)
+        return np.where(total != 0, values / total, even)
+
+
+def update_teams(
+    matches: List[Match], expectation: Callable[[np.ndarray], np.ndarray], k: float
+) -> None:
+    """Update the players of a batch of matches at once
+
+    Team ratings are the sum of their members ratings, a match between N teams
+    is decomposed into a game against each opponent and the change of the team is
+    the average change of its games. The change is shared between the team members
+    proportionally to their rating.
+
+    Players must appear at most once in ``matches``.
+
+    Parameters
+    ----------
+    matches:
+        Matches to update
+
+    expectation:
+        Win probability given the rating difference, vectorized
+
+    k:
+        Rating change of a game
+
+    """
+    if not matches:
+        return
+
+    teams = [
+        [list(team) if isinstance(team, Team) else [team] for team in match.teams]
+        for match in matches
+    ]
+    n_team = max(len(match) for match in teams)
+    n_size = max(len(team) for match in teams for team in match)
+
+    # index of each member in the flat list of players (match, team, players)
+    players = []
+    index = np.full((len(teams), n_team, n_size), -1, dtype=np.int64)
+    scores = np.full((len(teams), n_team), np.nan)
+
+    for m, (match, match_teams) in enumerate(zip(matches, teams)):
+        scores[m, : len(match.scores)] = match.scores
+
+        for t, team in enumerate(match_teams):
+            index[m, t, : len(team)] = np.arange(len(players), len(players) + len(team))
+            players.extend(team)
+
+    mask = index >= 0
+    mu = np.fromiter((p.mu for p in players), dtype=np.float64, count=len(players))
+    members = np.where(mask, mu[np.where(mask, index, 0)], 0)
+
+    # (match, team, opponent)
+    team = members.sum(axis=-1)
+    valid = ~np.isnan(scores)
+    pairs = valid[:, :, None] & valid[:, None, :] & ~np.eye(n_team, dtype=bool)
+
+    with np.errstate(invalid="ignore"):
+        result = (np.sign(scores[:, :, None] - scores[:, None, :]) + 1) / 2
+
+    delta = np.where(
+        pairs, result - expectation(team[:, :, None] - team[:, None, :]), 0
+    )
+    opponents = np.maximum(pairs.sum(axis=-1), 1)
+    delta = k * delta.sum(axis=-1) / opponents
+
+    change = delta[:, :, None] * _share(members, mask)
+    mu[index[mask]] += change[mask]
+
+    for p, v in zip(players, mu.tolist()):
+        p.mu = v
+
+    for match in matches:
+        for t in match.teams:
+            if isinstance(t, EloTeam):
+                t.reset()
+
+
+def has_duplicates(matches: Batch) -> bool:
+    """Returns true if a player appears in more than one match"""
+    seen = set()
+    count = 0
+
+    for match in matches:
+        for team in match.teams:
+            for p in list(team) if isinstance(team, Team) else [team]:
+                seen.add(id(p))
+                count += 1
+
+    return len(seen) != count
+
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    """Complementary error function, fractional error below 1.2e-7
+
+    References
+    ----------
+    .. [1] Numerical Recipes in C, 6.2 Incomplete Gamma Function, Error Function
+    """
+    z = np.abs(x)
+    t = 1 / (1 + 0.5 * z)
+
+    coefficients = (
+        0.17087277,
+        -0.82215223,
+        1.48851587,
+        -1.13520398,
+        0.27886807,
+        -0.18628806,
+        0.09678418,
+        0.37409196,
+        1.00002368,
+        -1.26551223,
+    )
+    poly = np.zeros_like(t)
+    for c in coefficients:
+        poly = poly * t + c
+
+    ans = t * np.exp(-z * z + poly)
+    return np.where(x >= 0, ans, 2 - ans)
+
+
+def _norm_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _norm_cdf_array(x: np.ndarray) -> np.ndarray:
+    return 0.5 * _erfc(-np.asarray(x, dtype=np.float64) / math.sqrt(2))
+
+
+def _logistic_cdf(x: float) -> float:
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+
+    e = math.exp(x)
+    return e / (1 + e)
+
+
+def _logistic_cdf_array(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1 + np.tanh(np.asarray(x, dtype=np.float64) / 2))
+
+
+class Distribution:
+    """Cumulative distribution computed without scipy, it has the ``name`` and the ``cdf``
+    of the matching ``scipy.stats`` distribution
+
+    The scalar path is exact, the vectorized path of the normal distribution
+    uses an approximation of erfc with a fractional error below 1.2e-7
+    """
+
+    def __init__(self, name, scalar, vectorized) -> None:
+        self.name = name
+        self.scalar = scalar
+        self.vectorized = vectorized
+
+    def cdf(self, x):
+        if np.ndim(x) == 0:
+            return self.scalar(x)
+        return self.vectorized(x)
+
+
+distributions = {
+    "norm": Distribution("norm", _norm_cdf, _norm_cdf_array),
+    "logistic": Distribution("logistic", _logistic_cdf, _logistic_cdf_array),
+}
+
+
 class Elo(Ranker):
-    """Generic Elo Rating System"""
+    """Generic Elo Rating System
+
+    Matches between more than two teams are decomposed into pairwise games,
+    see :func:`update_teams`.
 
-    def __init__(self, vol, distribution=norm, alpha=1) -> None:
+    Parameters
+    ----------
+    vol:
+        Volatility of the ratings
+
+    distribution:
+        ``norm``, ``logistic``, the name of a ``scipy.stats`` distribution or
+        an object with a ``cdf`` method. The normal and logistic distributions
+        (including ``scipy.stats.norm`` and ``scipy.stats.logistic``)
+        are computed without scipy.
+
+        ``Elo.dist`` is the distribution object, names are resolved to the
+        :class:`Distribution` of the normal and logistic distributions or to the ``scipy.stats`` one.
+
+    alpha:
+        Learning rate
+
+    """
+
+    def __init__(self, vol, distribution="norm", alpha=1) -> None:
         super().__init__()
 
         self.dist = distribution
         self.vol = vol
         self.alpha = alpha
 
+        if isinstance(distribution, str):
+            name = distribution
+        else:
+            # frozen distributions do not have a name
+            name = getattr(distribution, "name", None)
+
+        if name in distributions:
+            dist = distributions[name]
+            self._cdf, self._cdf_array = dist.scalar, dist.vectorized
+
+            if isinstance(distribution, str):
+                self.dist = dist
+        else:
+            if isinstance(distribution, str):
+                import scipy.stats
+
+                self.dist = getattr(scipy.stats, distribution)
+
+            self._cdf = self._cdf_array = self.dist.cdf
+
     def new_player(self, *args) -> EloPlayer:
         return EloPlayer(*args)
 
@@ -66,22 +291,37 @@ class Elo(Ranker):
             s2 = match.get_player(1).skill()
 
             n = (s1 - s2) / math.sqrt(2 * self.vol)
-            return self.dist.cdf(n)
+            return self._cdf(n)
 
         raise NotImplementedError()
 
+    def expectation(self, delta):
+        """Win probability given the rating difference"""
+        return self._cdf_array(delta / math.sqrt(2 * self.vol))
+
+    def quality_batch(self, mu, var, size):
+        return pairwise_quality(mu, var, lambda delta, _: self.expectation(delta))
+
     def update_match(self, match: Match) -> None:
+        if len(match) != 2:
+            return update_teams([match], self.expectation, self.k)
+
         p1 = match.get_player(0)
         p2 = match.get_player(1)
         y = match.get_result(p1)
 
-        expectation = self.win(match)
-
-        delta = self.k * ((y + 1) / 2 - expectation)
+        delta = self.k * ((y + 1) / 2 - self.win(match))
 
         p1.mu += delta
         p2.mu -= delta
 
+    def update_batch(self, matches: Batch) -> None:
+        if has_duplicates(matches):
+            # players need the result of their previous match
+            return super().update_batch(matches)
+
+        update_teams(list(matches), self.expectation, self.k)
+
 
 def make(*args, **kwargs):
     return Elo(*args, **kwargs)
@@ -1,5 +1,6 @@
-from ranked.models import Match, Ranker
-from ranked.models.elo import EloPlayer, EloTeam
+from ranked.models import Batch, Match, Ranker
+from ranked.models.elo import EloPlayer, EloTeam, has_duplicates, update_teams
+from ranked.utils.quality import pairwise_quality
 
 
 class ChessElo(Ranker):
@@ -25,15 +26,22 @@ class ChessElo(Ranker):
 
         raise NotImplementedError()
 
+    def expectation(self, delta):
+        """Win probability given the rating difference"""
+        return 1 / (1 + 10 ** (-delta / self.vol))
+
+    def quality_batch(self, mu, var, size):
+        return pairwise_quality(mu, var, lambda delta, _: self.expectation(delta))
+
     def update_match(self, match: Match) -> None:
-        p1 = match.get_player(0)
-        p2 = match.get_player(1)
-        y = (match.get_result(p1) + 1) / 2
+        update_teams([match], self.expectation, self.k)
 
-        expectation = self.win(match)
+    def update_batch(self, matches: Batch) -> None:
+        if has_duplicates(matches):
+            # players need the result of their previous match
+            return super().update_batch(matches)
 
-        p1.mu += self.k * (y - expectation)
-        p2.mu -= self.k * (y - expectation)
+        update_teams(list(matches), self.expectation, self.k)
 
 
 def make(*args, **kwargs):
@@ -0,0 +1,330 @@
+"""Rankers evaluating many hyperparameter configurations at once.
+
+Ratings are stored in arrays of shape ``(configuration, players)``, a batch of matches
+is applied to every configuration in a single NumPy pass. They follow the updates of
+:class:`ranked.models.elo.Elo` and :class:`ranked.models.glicko2.Glicko2` for matches between two teams.
+
+Matches are given in the encoded format of :class:`ranked.datasets.encoded.EncodedMatchup`,
+player ids of shape ``(match, team, players)`` padded with ``-1`` and team scores of shape
+``(match, team)``. A player can only appear once per batch.
+
+Examples
+--------
+
+.. code-block:: python
+
+    dataset = EncodedMatchup.encode(matchup.matches(), matchup.pool)
+
+    # 256 configurations replayed at once
+    vol, alpha = np.meshgrid(np.linspace(50, 400, 16), np.linspace(0.1, 2, 16))
+    ensemble = EloEnsemble(dataset.n_players, vol.ravel(), alpha.ravel(), center=1500)
+    ensemble.replay(dataset)
+
+"""
+
+import math
+
+import numpy as np
+from scipy.special import ndtr
+
+from ranked.models.glicko2 import Glicko2
+
+
+def _broadcast(*params):
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(p, float)) for p in params])
+    return [p.copy() for p in params]
+
+
+def _outcome(scores: np.ndarray) -> np.ndarray:
+    """Result of the first team, 1 win, 0.5 draw, 0 loss"""
+    if scores.shape[1] != 2:
+        raise NotImplementedError("Ensembles only support matches between two teams")
+
+    return (np.sign(scores[:, 0] - scores[:, 1]) + 1) / 2
+
+
+def _share(values: np.ndarray, mask: np.ndarray, total=None) -> np.ndarray:
+    """Share of each player in its team total, even split when the total is 0
+
+    values: (config, match, team, players)
+    """
+    if total is None:
+        total = values.sum(axis=-1)
+
+    total = total[..., None]
+    even = mask / mask.sum(axis=-1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total != 0, values / total, even)
+
+    return share
+
+
+class EnsembleRanker:
+    """Base class holding the ``(configuration, players)`` arrays"""
+
+    def __init__(self, n_players: int, n_configs: int) -> None:
+        self.n_players = n_players
+        self.n_configs = n_configs
+
+    def predict(self, teams: np.ndarray) -> np.ndarray:
+        """Win probability of the first team for every configuration, shape ``(config, match)``"""
+        raise NotImplementedError()
+
+    def update(self, teams: np.ndarray, scores: np.ndarray) -> None:
+        """Apply a batch of matches to every configuration"""
+        raise NotImplementedError()
+
+    def log_likelihood(self, teams: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Log-likelihood of the results given the current ratings, shape ``(config,)``"""
+        outcome = _outcome(scores)[None, :]
+        p = np.clip(self.predict(teams), 1e-12, 1 - 1e-12)
+        return (outcome * np.log(p) + (1 - outcome) * np.log(1 - p)).sum(axis=1)
+
+    def replay(self, dataset) -> np.ndarray:
+        """Apply every batch of an :class:`~ranked.datasets.encoded.EncodedMatchup`
+
+        Returns
+        -------
+        the prequential log-likelihood of each configuration, i.e. each batch is
+        predicted with the ratings obtained from the previous batches
+        """
+        offsets = dataset.offsets.tolist()
+        total = np.zeros(self.n_configs)
+
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            teams = dataset.teams[start:end]
+            scores = dataset.scores[start:end]
+
+            total += self.log_likelihood(teams, scores)
+            self.update(teams, scores)
+
+        return total
+
+    @staticmethod
+    def _gather(values: np.ndarray, teams: np.ndarray):
+        """Returns the values of the team members ``(config, match, team, players)`` and their mask"""
+        mask = teams >= 0
+        return values[:, np.where(mask, teams, 0)] * mask, mask
+
+    @staticmethod
+    def _scatter(values: np.ndarray, teams: np.ndarray, delta: np.ndarray) -> None:
+        mask = teams >= 0
+        values[:, teams[mask]] += delta[:, mask]
+
+
+class EloEnsemble(EnsembleRanker):
+    """Elo ratings for many ``(vol, alpha)`` configurations
+
+    Parameters
+    ----------
+    n_players:
+        Number of players
+
+    vol:
+        Volatility of each configuration
+
+    alpha:
+        Learning rate of each configuration, broadcasted with ``vol``
+
+    center:
+        Starting rating
+
+    """
+
+    def __init__(self, n_players: int, vol, alpha=1, center: float = 0) -> None:
+        self.vol, self.alpha = _broadcast(vol, alpha)
+        super().__init__(n_players, len(self.vol))
+
+        self.ratings = np.full((self.n_configs, n_players), float(center))
+
+    @property
+    def k(self) -> np.ndarray:
+        return self.alpha * self.vol * math.sqrt(math.pi)
+
+    def _predict(self, members: np.ndarray) -> np.ndarray:
+        sums = members.sum(axis=-1)
+        n = (sums[:, :, 0] - sums[:, :, 1]) / np.sqrt(2 * self.vol)[:, None]
+        return ndtr(n)
+
+    def predict(self, teams: np.ndarray) -> np.ndarray:
+        members, _ = self._gather(self.ratings, teams)
+        return self._predict(members)
+
+    def update(self, teams: np.ndarray, scores: np.ndarray) -> None:
+        members, mask = self._gather(self.ratings, teams)
+        expectation = self._predict(members)
+
+        # (config, match)
+        delta = self.k[:, None] * (_outcome(scores)[None, :] - expectation)
+
+        # first team gains delta, second team loses it
+        sign = np.array([1.0, -1.0])[None, None, :, None]
+        change = delta[:, :, None, None] * sign * _share(members, mask)
+        self._scatter(self.ratings, teams, change)
+
+
+class Glicko2Ensemble(EnsembleRanker):
+    """Glicko2 ratings for many ``tau`` configurations
+
+    Each team is rated as one player, its rating is the sum of its members ratings,
+    the deviation and volatility are the root sum of squares.
+    The change of the team is shared between its members proportionally to their value.
+
+    Parameters
+    ----------
+    n_players:
+        Number of players
+
+    tau:
+        Volatility constraint of each configuration
+
+    center:
+        Starting rating
+
+    scale:
+        Rating scale
+
+    deviation:
+        Starting deviation, broadcasted with ``tau``
+
+    vol:
+        Starting volatility, broadcasted with ``tau``, defaults to ``tau / 2``
+
+    """
+
+    EPS = Glicko2.EPS
+
+    def __init__(
+        self,
+        n_players: int,
+        tau,
+        center: float = 1500,
+        scale: float = 173.7178,
+        deviation=None,
+        vol=None,
+        max_iterations: int = 100,
+    ) -> None:
+        if deviation is None:
+            deviation = scale * 1.2
+
+        self.tau, deviation = _broadcast(tau, deviation)
+        if vol is None:
+            vol = self.tau / 2
+        (vol,) = _broadcast(vol)
+        vol = np.broadcast_to(vol, self.tau.shape)
+
+        super().__init__(n_players, len(self.tau))
+        self.center = center
+        self.scale = scale
+        self.max_iterations = max_iterations
+
+        shape = (self.n_configs, n_players)
+        self.ratings = np.full(shape, float(center))
+        self.deviations = np.repeat(deviation[:, None], n_players, axis=1)
+        self.volatilities = np.repeat(vol[:, None], n_players, axis=1)
+
+    def _teams(self, teams: np.ndarray):
+        ratings, mask = self._gather(self.ratings, teams)
+        deviations, _ = self._gather(self.deviations, teams)
+        volatilities, _ = self._gather(self.volatilities, teams)
+
+        # (config, match, team)
+        mu = (ratings.sum(axis=-1) - self.center) / self.scale
+        phi = np.sqrt((deviations**2).sum(axis=-1)) / self.scale
+        sigma = np.sqrt((volatilities**2).sum(axis=-1))
+
+        return (ratings, deviations, volatilities, mask), (mu, phi, sigma)
+
+    @staticmethod
+    def _g(phi):
+        return 1 / np.sqrt(1 + 3 * phi**2 / math.pi**2)
+
+    def _expectation(self, mu, phi):
+        """Expected result of each team against the other, ``(config, match, team)``"""
+        enemy_mu = mu[:, :, ::-1]
+        g = self._g(phi[:, :, ::-1])
+        return 1 / (1 + np.exp(-g * (mu - enemy_mu))), g
+
+    def predict(self, teams: np.ndarray) -> np.ndarray:
+        _, (mu, phi, _) = self._teams(teams)
+        expectation, _ = self._expectation(mu, phi)
+        return expectation[:, :, 0]
+
+    def _volatility(self, delta, phi, v, sigma):
+        """Illinois algorithm run on every team of every configuration at once"""
+        tau = self.tau[:, None, None]
+        ca = np.log(sigma**2)
+
+        def f(x):
+            ex = np.exp(x)
+            top = ex * (delta**2 - phi**2 - v - ex)
+            bot = 2 * (phi**2 + v + ex) ** 2
+            return top / bot - (x - ca) / tau**2
+
+        a = ca.copy()
+
+        # bounds
+        big = delta**2 > phi**2 + v
+        with np.errstate(invalid="ignore"):
+            b = np.where(big, np.log(np.where(big, delta**2 - phi**2 - v, 1)), 0)
+
+        k = np.ones_like(a)
+        pending = ~big
+        while pending.any():
+            pending &= f(a - k * tau) < 0
+            k += pending
+        b = np.where(big, b, a - k * tau)
+
+        fa = f(a)
+        fb = f(b)
+
+        for _ in range(self.max_iterations):
+            active = np.abs(b - a) > self.EPS
+            if not active.any():
+                break
+
+            c = a + (a - b) * fa / (fb - fa)
+            fc = f(c)
+
+            swap = fc * fb < 0
+            a = np.where(active & swap, b, a)
+            fa = np.where(active, np.where(swap, fb, fa / 2), fa)
+            b = np.where(active, c, b)
+            fb = np.where(active, fc, fb)
+
+        return np.exp(a / 2)
+
+    def update(self, teams: np.ndarray, scores: np.ndarray) -> None:
+        (ratings, deviations, volatilities, mask), (mu, phi, sigma) = self._teams(teams)
+
+        outcome = _outcome(scores)
+        # (match, team)
+        s = np.stack([outcome, 1 - outcome], axis=1)[None, :, :]
+
+        expectation, g = self._expectation(mu, phi)
+
+        # a certain outcome has no variance, keep the configurations that diverged finite
+        expectation = np.clip(expectation, 1e-12, 1 - 1e-12)
+        v = 1 / (g**2 * expectation * (1 - expectation))
+        delta = v * g * (s - expectation)
+
+        new_sigma = self._volatility(delta, phi, v, sigma)
+
+        phi_s = np.sqrt(phi**2 + new_sigma**2)
+        new_phi = 1 / np.sqrt(1 / phi_s**2 + 1 / v)
+        new_mu = mu + new_phi**2 * g * (s - expectation)
+
+        # team changes shared between the members
+        team_rating = ratings.sum(axis=-1)
+        team_deviation = phi * self.scale
+
+        changes = [
+            (self.ratings, ratings, team_rating, self.scale * new_mu + self.center),
+            (self.deviations, deviations, team_deviation, self.scale * new_phi),
+            (self.volatilities, volatilities, sigma, new_sigma),
+        ]
+
+        for array, members, total, new in changes:
+            change = (new - total)[..., None] * _share(members, mask, total)
+            self._scatter(array, teams, change)
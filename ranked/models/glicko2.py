@@ -2,7 +2,10 @@ import math
 from collections import defaultdict
 from typing import Tuple
 
+import numpy as np
+
 from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.quality import pairwise_quality
 
 
 class Glicko2Player(Player):
@@ -17,6 +20,9 @@ class Glicko2Player(Player):
     def consistency(self) -> float:
         return self.deviation
 
+    def state(self):
+        return (self.rating, self.deviation, self.volatility)
+
     def interval(self) -> Tuple[float, float]:
         eps = 2 * self.deviation
         return self.rating - eps, self.rating + eps
@@ -58,13 +64,29 @@ class Glicko2Team(Team):
 
         return self._volatility
 
-    @rating.setter
-    def rating(self, value):
-        diff = value - self.rating
+    def _share(self, attr: str, value: float, total: float) -> None:
+        """Share the change of the team between its members proportionally to their value"""
+        diff = value - total
 
         for p in self.players:
-            p.rating += diff * (p.rating / self.rating)
+            current = getattr(p, attr)
+            setattr(p, attr, current + diff * (current / total))
+
+    def update(self, rating: float, deviation: float, volatility: float) -> None:
+        """Set the rating, deviation and volatility of the team at once,
+        each member receives a share of the changes
+        """
+        # team values need to be computed before any member changes
+        totals = (self.rating, self.deviation, self.volatility)
+
+        self._share("rating", rating, totals[0])
+        self._share("deviation", deviation, totals[1])
+        self._share("volatility", volatility, totals[2])
+        self.reset()
 
+    @rating.setter
+    def rating(self, value):
+        self._share("rating", value, self.rating)
         self._rating = None
 
     @deviation.setter
@@ -74,21 +96,12 @@ class Glicko2Team(Team):
         #
         # Because we only observe the result of the overall team
         # we can't really estimate the deviation of individual players
-
-        diff = value - self.deviation
-
-        for p in self.players:
-            p.deviation += diff * (p.deviation / self.deviation)
-
+        self._share("deviation", value, self.deviation)
         self._deviation = None
 
     @volatility.setter
     def volatility(self, value):
-        diff = value - self.volatility
-
-        for p in self.players:
-            p.volatility += diff * (p.volatility / self.volatility)
-
+        self._share("volatility", value, self.volatility)
         self._volatility = None
 
 
@@ -107,7 +120,10 @@ def cache(func):
 
 
 class Glicko2(Ranker):
-    """Glicko extend the Elo system to take into account the consistency/reliability of the skill"""
+    """Glicko extend the Elo system to take into account the consistency/reliability of the skill
+
+    Matches between more than two teams are decomposed into a game against each opponent team.
+    """
 
     # System constants
     EPS = 0.000001
@@ -174,6 +190,22 @@ class Glicko2(Ranker):
         """Estimated win probably against a given ennemy"""
         return 1 / (1 + math.exp(-self.g(enemy) * (self.mu(player) - self.mu(enemy))))
 
+    @staticmethod
+    def opponents(player: Glicko2Player, match: Match):
+        """Every other team of the match and the result against it (1 win, 0.5 draw, 0 loss),
+        a match between N teams counts as a game against each opponent
+        """
+        index = next((i for i, p in enumerate(match.players) if p is player), None)
+        if index is None:
+            return []
+
+        score = match.scores[index]
+        return [
+            (enemy, 0.5 * (1 + (score > other) - (score < other)))
+            for i, (enemy, other) in enumerate(zip(match.players, match.scores))
+            if i != index
+        ]
+
     @cache
     def estimated_variance(self, player: Glicko2Player, matches: Batch) -> float:
         """Step 3: Compute the quantity v;
@@ -183,10 +215,9 @@ class Glicko2(Ranker):
         v = 0
 
         for match in matches:
-            enemy = match.get_enemy(player)
-
-            p = self.expectation(player, enemy)
-            v += (self.g(enemy) ** 2) * p * (1 - p)
+            for enemy, _ in self.opponents(player, match):
+                p = self.expectation(player, enemy)
+                v += (self.g(enemy) ** 2) * p * (1 - p)
 
         return 1 / v
 
@@ -200,10 +231,8 @@ class Glicko2(Ranker):
         v = self.estimated_variance(player, matches)
 
         for match in matches:
-            enemy = match.get_enemy(player)
-            result = (match.get_result(player) + 1) / 2
-
-            delta += self.g(enemy) * (result - self.expectation(player, enemy))
+            for enemy, result in self.opponents(player, match):
+                delta += self.g(enemy) * (result - self.expectation(player, enemy))
 
         return v * delta
 
@@ -259,10 +288,8 @@ class Glicko2(Ranker):
 
         score = 0
         for match in matches:
-            enemy = match.get_enemy(player)
-            s = (match.get_result(player) + 1) / 2
-
-            score += self.g(enemy) * (s - self.expectation(player, enemy))
+            for enemy, s in self.opponents(player, match):
+                score += self.g(enemy) * (s - self.expectation(player, enemy))
 
         mu_p = self.mu(player) + phi_p**2 * score
 
@@ -271,6 +298,14 @@ class Glicko2(Ranker):
 
         return new_rating, new_deviation, sp
 
+    def quality_batch(self, mu, var, size):
+        def win(delta, var):
+            phi2 = var / self.scale**2
+            g = 1 / np.sqrt(1 + 3 * phi2 / math.pi**2)
+            return 1 / (1 + np.exp(-g * delta / self.scale))
+
+        return pairwise_quality(mu, var, win)
+
     def update_match(self, match: Match) -> None:
         """Update all the players of a given match"""
         delayed_updates = dict()
@@ -280,13 +315,14 @@ class Glicko2(Ranker):
             delayed_updates[player] = update
 
         for player, (r, d, v) in delayed_updates.items():
+            if isinstance(player, Glicko2Team):
+                player.update(r, d, v)
+                continue
+
             player.rating = r
             player.deviation = d
             player.volatility = v
 
-            if hasattr(player, "reset"):
-                player.reset()
-
         # Cache is not valid anymore as a players were updated
         self.cache = dict()
         self.hits = defaultdict(int)
@@ -1,9 +1,12 @@
 import math
 from itertools import chain
 
+import numpy as np
+from scipy.special import log_ndtr, ndtr
 from trueskill import TrueSkill
 
 from ranked.models import Match, Player, Ranker, Team
+from ranked.utils.quality import gaussian_quality
 
 
 class NoSkillPlayer(Player):
@@ -17,6 +20,9 @@ class NoSkillPlayer(Player):
     def consistency(self) -> float:
         return self.rating.sigma
 
+    def state(self):
+        return (self.rating.mu, self.rating.sigma)
+
     @property
     def mu(self):
         return self.rating.mu
@@ -43,6 +49,37 @@ def ensure_team(players):
     return [to_team(p) for p in players]
 
 
+def _pdf(x):
+    return np.exp(-(x**2) / 2) / math.sqrt(2 * math.pi)
+
+
+def _v_win(t, e):
+    x = t - e
+    return np.exp(-(x**2) / 2 - math.log(math.sqrt(2 * math.pi)) - log_ndtr(x))
+
+
+def _w_win(t, e):
+    v = _v_win(t, e)
+    return np.clip(v * (v + t - e), 0, 1)
+
+
+def _draw(t, e):
+    a, b = e - np.abs(t), -e - np.abs(t)
+    denom = np.maximum(ndtr(a) - ndtr(b), 1e-300)
+    return a, b, denom
+
+
+def _v_draw(t, e):
+    a, b, denom = _draw(t, e)
+    return (_pdf(b) - _pdf(a)) / denom * np.where(t < 0, -1, 1)
+
+
+def _w_draw(t, e):
+    a, b, denom = _draw(t, e)
+    v = (_pdf(b) - _pdf(a)) / denom
+    return np.clip(v**2 + (a * _pdf(a) - b * _pdf(b)) / denom, 0, 1)
+
+
 class NoSkill(Ranker):
     """NoSkill is a bayesian skill rating system, supports team
 
@@ -121,6 +158,9 @@ class NoSkill(Ranker):
     def quality(self, match: Match) -> float:
         return self.model.quality(ensure_team(match.players))
 
+    def quality_batch(self, mu, var, size):
+        return gaussian_quality(mu, var, size, self.model.beta)
+
     def update_match(self, match: Match) -> None:
         teams = ensure_team(match.players)
 
@@ -133,6 +173,176 @@ class NoSkill(Ranker):
             for p, rating in zip(team, ratings):
                 p.rating = rating
 
+    def smooth(self, dataset, sweeps: int = 10, tol: float = 1e-4):
+        """TrueSkill Through Time, estimate the skill of every player at every match
+        using the whole history instead of only the previous matches.
+
+        The skill of a player follows a random walk (``tau``) between their matches,
+        messages are passed forward and backward along the history of each player
+        until the estimates stop changing. Each batch is processed at once,
+        a player can only appear once per batch.
+
+        With ``sweeps=0`` only the forward pass runs, which gives the same ratings
+        as updating the matches one after the other.
+
+        References
+        ----------
+        .. [1] Pierre Dangauthier, Ralf Herbrich, Tom Minka, Thore Graepel, "TrueSkill Through Time: Revisiting the History of Chess"
+
+        Parameters
+        ----------
+        dataset:
+            :class:`~ranked.datasets.encoded.EncodedMatchup` with matches between two teams,
+            if it has a pool the ratings of its players are set to their latest estimate
+
+        sweeps:
+            Maximum number of backward and forward passes after the first forward pass
+
+        tol:
+            Stop when the largest change of a skill estimate is below this value
+
+        Returns
+        -------
+        the mean and the standard deviation of the skill of each player at each match,
+        arrays of shape ``(match, team, players)``, padding is ``nan``
+        """
+        start, end = int(dataset.offsets[0]), int(dataset.offsets[-1])
+        teams = np.asarray(dataset.teams[start:end])
+        scores = np.asarray(dataset.scores[start:end])
+
+        if teams.shape[1] != 2:
+            raise NotImplementedError(
+                "Smoothing only supports matches between two teams"
+            )
+
+        _, n_team, n_size = teams.shape
+        mask = teams >= 0
+
+        # one slot per player per match, ordered by match
+        slots = np.flatnonzero(mask.ravel())
+        pids = teams.ravel()[slots]
+        matches = slots // (n_team * n_size)
+        bounds = np.searchsorted(matches, dataset.offsets - start).tolist()
+
+        # previous and next slot of the same player
+        order = np.argsort(pids, kind="stable")
+        same = pids[order][1:] == pids[order][:-1]
+        prev = np.full(len(slots), -1)
+        after = np.full(len(slots), -1)
+        prev[order[1:][same]] = order[:-1][same]
+        after[order[:-1][same]] = order[1:][same]
+
+        # gaussian messages in natural parameters (precision, precision * mean)
+        forward = np.zeros((2, len(slots)))
+        backward = np.zeros((2, len(slots)))
+        likelihood = np.zeros((2, len(slots)))
+
+        dynamic = self.model.tau**2
+        first = 1 / (self.model.sigma**2 + dynamic)
+        first = np.array([first, first * self.model.mu])
+
+        # result of the first team: 1 win, 0 loss, 0.5 draw
+        outcome = (np.sign(scores[:, 0] - scores[:, 1]) + 1) / 2
+        beta2 = self.model.beta**2
+        margin = (
+            self.model.ppf((self.model.draw_probability + 1) / 2)
+            * np.sqrt(mask.sum(axis=(1, 2)))
+            * self.model.beta
+        )
+
+        def drift(messages, links, s):
+            """Message from the neighbouring slot of the same player, uniform (0) if there is none"""
+            link = links[s]
+            has = link >= 0
+            message = messages[:, link] + likelihood[:, link]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                var = 1 / message[0] + dynamic
+                new = np.array([1 / var, message[1] / message[0] / var])
+
+            return np.where(has, new, 0), has
+
+        def game(s, m0, m1):
+            """Likelihood message of each match given the rest of the history"""
+            cavity = forward[:, s] + backward[:, s]
+            mu = np.zeros(((m1 - m0) * n_team * n_size))
+            var = np.zeros_like(mu)
+
+            local = slots[s] - m0 * n_team * n_size
+            mu[local] = cavity[1] / cavity[0]
+            var[local] = 1 / cavity[0]
+            mu = mu.reshape(-1, n_team, n_size)
+            var = var.reshape(-1, n_team, n_size)
+
+            team_mu = mu.sum(axis=-1)
+            team_var = (var + beta2 * mask[m0:m1]).sum(axis=-1)
+            c = np.sqrt(team_var.sum(axis=-1))
+
+            result = outcome[m0:m1]
+            draw = result == 0.5
+            sign = np.where(result >= 0.5, 1.0, -1.0)
+
+            t = sign * (team_mu[:, 0] - team_mu[:, 1]) / c
+            e = margin[m0:m1] / c
+            v = np.where(draw, _v_draw(t, e), _v_win(t, e))
+            w = np.where(draw, _w_draw(t, e), _w_win(t, e))
+
+            direction = sign[:, None] * np.array([1.0, -1.0])[None, :]
+            c = c[:, None, None]
+            new_mu = mu + direction[:, :, None] * var / c * v[:, None, None]
+            new_var = var * (1 - var / c**2 * w[:, None, None])
+
+            new_mu = new_mu.ravel()[local]
+            new_var = new_var.ravel()[local]
+            likelihood[0, s] = 1 / new_var - cavity[0]
+            likelihood[1, s] = new_mu / new_var - cavity[1]
+
+        def forward_pass():
+            for b in range(len(bounds) - 1):
+                s = slice(bounds[b], bounds[b + 1])
+                message, has = drift(forward, prev, s)
+                forward[:, s] = np.where(has, message, first[:, None])
+                if s.start < s.stop:
+                    game(s, int(matches[s.start]), int(matches[s.stop - 1]) + 1)
+
+        def backward_pass():
+            for b in reversed(range(len(bounds) - 1)):
+                s = slice(bounds[b], bounds[b + 1])
+                backward[:, s], _ = drift(backward, after, s)
+                if s.start < s.stop:
+                    game(s, int(matches[s.start]), int(matches[s.stop - 1]) + 1)
+
+        def marginal():
+            posterior = forward + backward + likelihood
+            return posterior[1] / posterior[0], 1 / np.sqrt(posterior[0])
+
+        forward_pass()
+        mu, sigma = marginal()
+
+        for _ in range(sweeps):
+            backward_pass()
+            forward_pass()
+
+            new_mu, sigma = marginal()
+            change = np.abs(new_mu - mu).max(initial=0)
+            mu = new_mu
+
+            if change < tol:
+                break
+
+        if dataset.pool is not None:
+            last = np.flatnonzero(after < 0)
+            for i, m, s in zip(
+                pids[last].tolist(), mu[last].tolist(), sigma[last].tolist()
+            ):
+                dataset.pool[i].rating = self.model.create_rating(m, s)
+
+        mu_array = np.full(teams.shape, np.nan)
+        sigma_array = np.full(teams.shape, np.nan)
+        mu_array.ravel()[slots] = mu
+        sigma_array.ravel()[slots] = sigma
+        return mu_array, sigma_array
+
 
 def make(*args, **kwargs):
     return NoSkill(*args, **kwargs)
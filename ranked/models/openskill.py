@@ -2,6 +2,7 @@ from openskill import Rating, predict_win, rate
 from openskill.models import PlackettLuce
 
 from ranked.models import Match, Player, Ranker, Team
+from ranked.utils.quality import gaussian_quality
 
 
 class OpenSkillPlayer(Player):
@@ -18,6 +19,9 @@ class OpenSkillPlayer(Player):
     def consistency(self) -> float:
         return self.rating.sigma
 
+    def state(self):
+        return (self.rating.mu, self.rating.sigma)
+
     @property
     def mu(self):
         return self.rating.mu
@@ -95,6 +99,17 @@ class OpenSkill(Ranker):
 
         raise NotImplementedError()
 
+    @property
+    def beta(self):
+        if "beta" in self.options:
+            return self.options["beta"]
+
+        # openskill defaults
+        return self.options.get("sigma", 25 / 3) / 2
+
+    def quality_batch(self, mu, var, size):
+        return gaussian_quality(mu, var, size, self.beta)
+
     def update_match(self, match: Match) -> None:
         teams = ensure_team(match.players)
 
@@ -106,3 +121,7 @@ class OpenSkill(Ranker):
         ) in zip(teams, new_ratings):
             for p, rating in zip(team, ratings):
                 p.rating = rating
+
+
+def make(*args, **kwargs):
+    return OpenSkill(*args, **kwargs)
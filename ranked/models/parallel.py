@@ -0,0 +1,272 @@
+"""Update the matches of a batch concurrently.
+
+A :class:`~ranked.models.Batch` contains each player at most once so its matches
+are independent, :class:`ParallelRanker` splits a batch in chunks and updates them on a pool of workers.
+
+Each chunk is given to the ``update_batch`` of the wrapped ranker so vectorized
+updates (e.g. ``Elo``) are kept.
+
+* ``thread`` workers update the players in place.
+  The speedup depends on how much of the update releases the GIL.
+
+* ``process`` workers read the players from a shared memory array of player states
+  (see :meth:`~ranked.models.Player.state`), recreate them with the ranker,
+  update them and write their new state back; only the layout of the matches is pickled.
+  The ranker is sent once to each worker when the pool is created by :class:`ParallelRanker`.
+  It is worth it when updating a match is expensive compared to recreating its players,
+  e.g. ``NoSkill`` or ``OpenSkill``.
+
+Only the players are updated concurrently, rankers keeping state across matches
+(``Ranker.stateful``, e.g. ``WHR`` or ``BradleyTerry``) cannot be parallelized.
+
+Examples
+--------
+
+.. code-block:: python
+
+    with ParallelRanker(NoSkill(1500, 173), workers=8, mode="process") as ranker:
+        for batch in matchup.matches():
+            ranker.update(batch)
+
+"""
+
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.arrays import capacity
+from ranked.utils.shared import allocate, attach
+
+# matches described by the rows of their players in the shared states,
+# ((rows, is team), ...), scores
+Layout = Tuple[List[Tuple[List[int], bool]], List[float]]
+
+# ranker of the worker process, set when the pool is created
+_ranker: Optional[Ranker] = None
+
+
+def _chunks(matches: List[Match], count: int) -> List[List[Match]]:
+    size, extra = divmod(len(matches), count)
+    chunks = []
+
+    start = 0
+    for i in range(count):
+        end = start + size + (i < extra)
+        if end > start:
+            chunks.append(matches[start:end])
+        start = end
+
+    return chunks
+
+
+def _update_chunk(ranker: Ranker, matches: List[Match]) -> None:
+    ranker.update_batch(Batch(*matches))
+
+
+def _init_worker(ranker: Ranker) -> None:
+    global _ranker
+    _ranker = ranker
+
+
+def _update_shared(ranker, name, shape, key, matches: List[Layout]) -> None:
+    """Worker entry point, recreates the players from their shared state,
+    updates them and writes their new state back
+    """
+    ranker = ranker or _ranker
+    states = attach(name, shape, np.float64, key)
+
+    rows = []
+    players = []
+    batch = []
+
+    for teams, scores in matches:
+        leaderboard = []
+
+        for (members, is_team), score in zip(teams, scores):
+            team = [ranker.new_player(*states[row].tolist()) for row in members]
+            rows.extend(members)
+            players.extend(team)
+
+            leaderboard.append((ranker.new_team(*team) if is_team else team[0], score))
+
+        batch.append(Match(*leaderboard))
+
+    _update_chunk(ranker, batch)
+    states[rows] = [p.state() for p in players]
+
+
+class ParallelRanker(Ranker):
+    """Wrap a ranker to update the matches of a batch on a pool of workers
+
+    Parameters
+    ----------
+    ranker:
+        Ranker updating the matches
+
+    workers:
+        Number of workers, batches are updated sequentially when 1 or less
+
+    mode:
+        ``thread`` or ``process``
+
+    min_matches:
+        Smaller batches are updated sequentially
+
+    executor:
+        Executor to use instead of creating one
+
+    """
+
+    def __init__(
+        self,
+        ranker: Ranker,
+        workers: int = 1,
+        mode: str = "thread",
+        min_matches: int = 2,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown mode {mode}")
+
+        if ranker.stateful and (workers > 1 or executor is not None):
+            raise ValueError(
+                f"{ranker.__class__.__name__} keeps state across matches "
+                "and cannot update them concurrently"
+            )
+
+        self.ranker = ranker
+        self.workers = workers
+        self.mode = mode
+        self.min_matches = min_matches
+
+        # ranker sent with each chunk, workers of our own pool already have it
+        self.worker_ranker: Optional[Ranker] = ranker
+
+        self.executor = executor
+        if self.executor is None and workers > 1:
+            if mode == "thread":
+                self.executor = ThreadPoolExecutor(workers)
+            else:
+                self.executor = ProcessPoolExecutor(
+                    workers, initializer=_init_worker, initargs=(ranker,)
+                )
+                self.worker_ranker = None
+
+        # shared player states of the process mode, workers only keep the latest segment
+        self.key = uuid.uuid4().hex
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.states = np.zeros((0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+        if self.shm is not None:
+            del self.states
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def _allocate(self, size: int, width: int) -> np.ndarray:
+        """Shared states able to hold ``size`` players, the segment is only
+        replaced when the capacity is exceeded
+        """
+        rows, columns = self.states.shape
+        if self.shm is not None and size <= rows and width == columns:
+            return self.states
+
+        old = self.shm
+        self.shm, states = allocate((capacity(rows, size), width), np.float64)
+
+        if old is not None:
+            del self.states
+            old.close()
+            old.unlink()
+
+        return states
+
+    def new_player(self, *args, **config) -> Player:
+        return self.ranker.new_player(*args, **config)
+
+    def new_team(self, *players, **config) -> Team:
+        return self.ranker.new_team(*players, **config)
+
+    def win(self, match: Match) -> float:
+        return self.ranker.win(match)
+
+    def quality_batch(self, mu, var, size):
+        return self.ranker.quality_batch(mu, var, size)
+
+    def update_match(self, match: Match) -> None:
+        self.ranker.update_match(match)
+
+    def update_batch(self, matches: Batch) -> None:
+        matches = list(matches)
+
+        if self.executor is None or len(matches) < max(self.min_matches, 2):
+            return _update_chunk(self.ranker, matches)
+
+        if self.mode == "process":
+            return self._update_processes(matches)
+
+        futures = [
+            self.executor.submit(_update_chunk, self.ranker, chunk)
+            for chunk in _chunks(matches, self.workers)
+        ]
+
+        for future in futures:
+            future.result()
+
+    def _update_processes(self, matches: List[Match]) -> None:
+        players: List[Player] = []
+        layouts: List[Layout] = []
+
+        for match in matches:
+            teams = []
+            for team in match.teams:
+                members = list(team) if isinstance(team, Team) else [team]
+                rows = list(range(len(players), len(players) + len(members)))
+
+                teams.append((rows, isinstance(team, Team)))
+                players.extend(members)
+
+            layouts.append((teams, list(match.scores)))
+
+        states = np.array([p.state() for p in players], dtype=np.float64)
+        self.states = self._allocate(*states.shape)
+        self.states[: len(players)] = states
+
+        futures = [
+            self.executor.submit(
+                _update_shared,
+                self.worker_ranker,
+                self.shm.name,
+                self.states.shape,
+                self.key,
+                chunk,
+            )
+            for chunk in _chunks(layouts, self.workers)
+        ]
+
+        for future in futures:
+            future.result()
+
+        for player, state in zip(players, self.states[: len(players)].tolist()):
+            vars(player).update(vars(self.ranker.new_player(*state)))
+
+        # teams might cache the values of their members
+        for match in matches:
+            for team in match.teams:
+                if hasattr(team, "reset"):
+                    team.reset()
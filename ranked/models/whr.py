@@ -0,0 +1,315 @@
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy.linalg import solve_banded
+
+from ranked.models import Batch, Match, Player, Ranker, Team
+from ranked.utils.arrays import grow
+from ranked.utils.quality import pairwise_quality
+
+
+class WHRPlayer(Player):
+    """Player with a rating for each time step they played at
+
+    Ratings are stored in natural units (logistic scale),
+    :meth:`skill` returns the latest rating in rating points.
+    """
+
+    def __init__(self, center=1500, scale=173.7178, *args) -> None:
+        self.center = center
+        self.scale = scale
+
+        # time step of each rating
+        self.days: List[int] = []
+        # rating at each time step
+        self.r: List[float] = []
+        # index of each rating in the ranker ratings array
+        self.slots: List[int] = []
+        # id of the teams the player played in at each time step
+        self.games: List[List[int]] = []
+        # variance of the latest rating
+        self.variance = None
+
+    def skill(self) -> float:
+        if not self.r:
+            return self.center
+        return self.center + self.scale * self.r[-1]
+
+    def consistency(self) -> float:
+        if self.variance is None:
+            return 0
+        return self.scale * math.sqrt(self.variance)
+
+    def trajectory(self) -> Tuple[List[int], List[float]]:
+        """Time steps and ratings (in rating points) of the player"""
+        return list(self.days), [self.center + self.scale * r for r in self.r]
+
+    def _day(self, day: int) -> int:
+        """Index of the rating at ``day``, a new rating is added if needed"""
+        if self.days and self.days[-1] == day:
+            return len(self.days) - 1
+
+        # start from the latest estimate
+        self.days.append(day)
+        self.r.append(self.r[-1] if self.r else 0.0)
+        self.games.append([])
+        return len(self.days) - 1
+
+
+class WHRTeam(Team):
+    def skill(self) -> float:
+        return sum(p.skill() for p in self.players)
+
+
+class WHR(Ranker):
+    """Whole-History Rating, the rating of a player is a trajectory over time
+    estimated from all of their matches.
+
+    Consecutive ratings of a player follow a Wiener process, i.e.
+    ``r[t + 1] - r[t] ~ N(0, w2 * (t + 1 - t))``, and the results follow
+    the Bradley-Terry model on the sum of the team members rating.
+    Each player trajectory is updated with Newton's method,
+    the Hessian of a single player is tridiagonal so a step is linear in the number of time steps.
+
+    Each batch of matches is a new time step; updating only runs Newton steps
+    for the players of the new matches, :meth:`fit` iterates over every player that played.
+
+    Games are stored in flat arrays, the members of each team and the teams of each game
+    are contiguous, so the gradient of a player is computed on all their games at once.
+
+    References
+    ----------
+    .. [1] Rémi Coulom, "Whole-History Rating: A Bayesian Rating System for Players of Time-Varying Strength"
+
+    Parameters
+    ----------
+    center:
+        Rating of a new player
+
+    scale:
+        Rating points per natural unit
+
+    drift:
+        Standard deviation of the rating change between two time steps in rating points
+
+    prior:
+        Standard deviation of the rating of a new player in rating points
+
+    iterations:
+        Newton steps per player after each batch
+
+    """
+
+    stateful = True
+
+    def __init__(
+        self,
+        center: float = 1500,
+        scale: float = 173.7178,
+        drift: float = 60,
+        prior: float = 350,
+        iterations: int = 2,
+    ) -> None:
+        self.center = center
+        self.scale = scale
+        self.w2 = (drift / scale) ** 2
+        self.prior_var = (prior / scale) ** 2
+        self.iterations = iterations
+
+        self.time = 0
+        # players that played at least once
+        self.players: List[WHRPlayer] = []
+        self.pids: Dict[int, int] = dict()
+
+        # rating of every player at every time step they played, see WHRPlayer.slots
+        self.ratings = np.zeros(0)
+        self.n_slots = 0
+
+        # rating slot of each team member
+        self.members = np.zeros(0, dtype=np.int64)
+        # game and score of each team, members of team t are members[team_offsets[t]:team_offsets[t + 1]]
+        self.team_game = np.zeros(0, dtype=np.int64)
+        self.team_score = np.zeros(0)
+        self.team_offsets = np.zeros(1, dtype=np.int64)
+        # teams of game g are game_offsets[g]:game_offsets[g + 1]
+        self.game_offsets = np.zeros(1, dtype=np.int64)
+
+        self.n_members = 0
+        self.n_teams = 0
+        self.n_games = 0
+
+    def new_player(self, *args) -> WHRPlayer:
+        return WHRPlayer(self.center, self.scale)
+
+    def new_team(self, *players, **config) -> WHRTeam:
+        return WHRTeam(*players, **config)
+
+    def _cdf(self, z):
+        return 1 / (1 + np.exp(-z))
+
+    def win(self, match: Match) -> float:
+        if len(match) == 2:
+            s1 = match.get_player(0).skill()
+            s2 = match.get_player(1).skill()
+            return float(self._cdf((s1 - s2) / self.scale))
+
+        raise NotImplementedError()
+
+    def quality_batch(self, mu, var, size):
+        return pairwise_quality(mu, var, lambda delta, _: self._cdf(delta / self.scale))
+
+    def _register(self, player: WHRPlayer) -> None:
+        if id(player) not in self.pids:
+            self.pids[id(player)] = len(self.players)
+            self.players.append(player)
+
+    def _slot(self, player: WHRPlayer, day: int) -> int:
+        """Index of the rating of the player at ``day``, a new rating is added if needed"""
+        k = player._day(day)
+
+        if k == len(player.slots):
+            self.ratings = grow(self.ratings, self.n_slots + 1)
+            self.ratings[self.n_slots] = player.r[k]
+            player.slots.append(self.n_slots)
+            self.n_slots += 1
+
+        return k
+
+    def record(self, matches: Batch) -> List[WHRPlayer]:
+        """Add a time step with the given matches, returns the players that played"""
+        day = self.time
+        self.time += 1
+        played = []
+
+        for match in matches:
+            n_team = len(match.teams)
+            self.team_game = grow(self.team_game, self.n_teams + n_team)
+            self.team_score = grow(self.team_score, self.n_teams + n_team)
+            self.team_offsets = grow(self.team_offsets, self.n_teams + n_team + 1)
+
+            for team, score in zip(match.teams, match.scores):
+                members = list(team) if isinstance(team, Team) else [team]
+                self.members = grow(self.members, self.n_members + len(members))
+
+                for player in members:
+                    self._register(player)
+                    k = self._slot(player, day)
+
+                    player.games[k].append(self.n_teams)
+                    self.members[self.n_members] = player.slots[k]
+                    self.n_members += 1
+                    played.append(player)
+
+                self.team_game[self.n_teams] = self.n_games
+                self.team_score[self.n_teams] = score
+                self.n_teams += 1
+                self.team_offsets[self.n_teams] = self.n_members
+
+            self.n_games += 1
+            self.game_offsets = grow(self.game_offsets, self.n_games + 1)
+            self.game_offsets[self.n_games] = self.n_teams
+
+        return played
+
+    def _gradient(self, player: WHRPlayer):
+        """Gradient and negative Hessian diagonal of the log-likelihood of the games
+        for each rating of the player
+        """
+        n = len(player.days)
+
+        # (games) team of the player in each game and the rating it used
+        mine = np.fromiter((t for teams in player.games for t in teams), dtype=np.int64)
+        k = np.repeat(np.arange(n), [len(teams) for teams in player.games])
+
+        # (pairs) every opponent team of each game
+        game = self.team_game[mine]
+        pair, other = _ranges(self.game_offsets[game], self.game_offsets[game + 1])
+        keep = other != mine[pair]
+        pair, other = pair[keep], other[keep]
+
+        # team ratings are the sum of their members
+        teams, index = np.unique(np.concatenate([mine, other]), return_inverse=True)
+        team, member = _ranges(self.team_offsets[teams], self.team_offsets[teams + 1])
+        ratings = np.bincount(
+            team, self.ratings[self.members[member]], minlength=len(teams)
+        )
+        ratings = ratings[index]
+        mine_rating, other_rating = ratings[: len(mine)], ratings[len(mine) :]
+
+        p = 1 / (1 + np.exp(other_rating - mine_rating[pair]))
+        y = (np.sign(self.team_score[mine[pair]] - self.team_score[other]) + 1) / 2
+
+        g = np.bincount(k[pair], y - p, minlength=n)
+        h = np.bincount(k[pair], p * (1 - p), minlength=n)
+        return g, h
+
+    def newton(self, player: WHRPlayer) -> None:
+        """One Newton step on the whole trajectory of a player"""
+        n = len(player.days)
+        if n == 0:
+            return
+
+        r = np.asarray(player.r)
+        g, h = self._gradient(player)
+
+        # gaussian prior on the first rating
+        g[0] -= r[0] / self.prior_var
+        h[0] += 1 / self.prior_var
+
+        # Wiener process between consecutive ratings
+        days = np.asarray(player.days)
+        inv = 1 / (self.w2 * np.diff(days))
+        d = (r[:-1] - r[1:]) * inv
+
+        g[:-1] -= d
+        g[1:] += d
+        h[:-1] += inv
+        h[1:] += inv
+
+        # tridiagonal negative Hessian in banded form
+        ab = np.zeros((3, n))
+        ab[0, 1:] = -inv
+        ab[1] = h
+        ab[2, :-1] = -inv
+
+        r = r + solve_banded((1, 1), ab, g)
+        player.r = r.tolist()
+        self.ratings[player.slots] = r
+
+        last = np.zeros(n)
+        last[-1] = 1
+        player.variance = float(solve_banded((1, 1), ab, last)[-1])
+
+    def fit(self, iterations: int = 10) -> None:
+        """Run Newton steps over every player of the history"""
+        for _ in range(iterations):
+            for player in self.players:
+                self.newton(player)
+
+    def update_match(self, match: Match) -> None:
+        self.update_batch(Batch(match))
+
+    def update_batch(self, matches: Batch) -> None:
+        played = self.record(matches)
+
+        for _ in range(self.iterations):
+            for player in played:
+                self.newton(player)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate the ranges ``starts[i]:ends[i]``
+
+    Returns
+    -------
+    the range of each element and the elements
+    """
+    counts = ends - starts
+    rows = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return rows, starts[rows] + np.arange(len(rows)) - offsets[rows]
+
+
+def make(*args, **kwargs):
+    return WHR(*args, **kwargs)
@@ -1,26 +1,49 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Optional, TextIO, Union
 
-from ranked.models import Batch, Match, Team
+from ranked.datasets.encoded import build_batch
+from ranked.models import Batch, Match, Player, Ranker, Team
 
 
 class SaveEvolution:
-    def __init__(self, fname: str, pool, ranker) -> None:
+    """Save the skill estimate of every player after each batch
+
+    Parameters
+    ----------
+    fname:
+        Name of the csv file, a text stream (e.g. ``io.StringIO``) to keep the rows in memory
+        or None to discard them
+
+    pool:
+        List of players
+
+    ranker:
+        Ranker estimating the skills
+
+    """
+
+    def __init__(self, fname: Union[str, TextIO, None], pool, ranker) -> None:
         self.fs = None
-        if fname is not None:
+        self.owned = False
+
+        if isinstance(fname, str):
             self.fs = open(fname, "w")
+            self.owned = True
+        elif fname is not None:
+            self.fs = fname
 
         self.header()
         self.ranker = ranker.__class__.__name__
         self.pool = pool
-
-        fname.rsplit(".", maxsplit=1)[0]
         self.previous = dict()
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args, **kwargs):
-        if self.fs:
+        if self.owned:
             self.fs.__exit__(*args, **kwargs)
 
     def header(self):
@@ -97,6 +120,18 @@ class Simulation:
         self.matchups = matchups
 
     def simulate(self, statfs="simulation.csv", filter=None):
+        """Update the ranker with every batch of the matchup
+
+        Parameters
+        ----------
+        statfs:
+            Where to save the skill evolution, see :class:`SaveEvolution`;
+            None disables it
+
+        filter:
+            Only save the players with an id greater or equal to ``filter``
+
+        """
         last_print = 0
 
         with SaveEvolution(statfs, self.matchups.pool, self.ranker) as saver:
@@ -197,6 +232,95 @@ class Simulation:
         return stats
 
 
+class MultiSimulation:
+    """Replay the same matches for many rankers in a single pass
+
+    Each batch is decoded once into lists of player ids (see :meth:`~ranked.datasets.encoded.EncodedMatchup.decoded`)
+    and then turned into the matches of every ranker, each ranker has its own pool of players.
+
+    Parameters
+    ----------
+    rankers:
+        Rankers to compare, by name
+
+    dataset:
+        :class:`~ranked.datasets.encoded.EncodedMatchup` to replay
+
+    workers:
+        Number of threads updating the rankers, 0 updates them one after the other
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        sim = MultiSimulation(dict(elo=Elo(200), glicko2=Glicko2()), dataset, workers=2)
+        pools = sim.simulate()
+
+    """
+
+    def __init__(self, rankers: Dict[str, Ranker], dataset, workers: int = 0) -> None:
+        self.rankers = rankers
+        self.dataset = dataset
+        self.workers = workers
+        self.pools: Dict[str, List[Player]] = {
+            name: [ranker.new_player() for _ in range(dataset.n_players)]
+            for name, ranker in rankers.items()
+        }
+
+    def _update(self, name: str, batch) -> None:
+        ranker = self.rankers[name]
+        ranker.update(build_batch(ranker, self.pools[name], batch))
+
+    def simulate(
+        self, statfs: Optional[Dict[str, Union[str, TextIO, None]]] = None
+    ) -> Dict[str, List[Player]]:
+        """Update every ranker with every batch of the dataset
+
+        Parameters
+        ----------
+        statfs:
+            Where to save the skill evolution of each ranker, see :class:`SaveEvolution`
+
+        Returns
+        -------
+        the pool of players of each ranker
+        """
+        statfs = statfs or dict()
+        names = list(self.rankers)
+
+        with ExitStack() as stack:
+            savers = {
+                name: stack.enter_context(
+                    SaveEvolution(
+                        statfs.get(name), self.pools[name], self.rankers[name]
+                    )
+                )
+                for name in names
+            }
+
+            for name, saver in savers.items():
+                saver.save(0, self.rankers[name].__class__.__name__)
+
+            executor = None
+            if self.workers > 0:
+                executor = stack.enter_context(ThreadPoolExecutor(self.workers))
+
+            for i, batch in enumerate(self.dataset.decoded()):
+                if executor is None:
+                    for name in names:
+                        self._update(name, batch)
+                else:
+                    futures = [executor.submit(self._update, n, batch) for n in names]
+                    for future in futures:
+                        future.result()
+
+                for name, saver in savers.items():
+                    saver.save(i + 1, self.rankers[name].__class__.__name__)
+
+        return self.pools
+
+
 def skill_estimate_evolution(dataframe, title=None):
     import altair as alt
 
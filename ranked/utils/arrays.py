@@ -0,0 +1,47 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def capacity(current: int, size: int) -> int:
+    """Capacity needed to hold ``size`` elements, the capacity is at least doubled when it grows"""
+    if size <= current:
+        return current
+
+    return max(size, 2 * current)
+
+
+def grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Make sure the array can hold ``size`` elements, capacity is doubled
+    so appending elements one batch at a time stays amortized O(1)
+    """
+    if size <= len(array):
+        return array
+
+    grown = np.zeros(capacity(len(array), size), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def pad_matches(
+    matches: List[List[List[int]]], scores: Sequence[Sequence[float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad a list of matches, given as lists of teams of player ids, to build arrays
+
+    Returns
+    -------
+    player ids of shape ``(match, team, players)`` padded with ``-1`` and the score of each team
+    of shape ``(match, team)``, missing teams are ``nan``
+    """
+    n_team = max((len(teams) for teams in matches), default=0)
+    n_size = max((len(team) for teams in matches for team in teams), default=0)
+
+    teams_array = np.full((len(matches), n_team, n_size), -1, dtype=np.int32)
+    scores_array = np.full((len(matches), n_team), np.nan, dtype=np.float64)
+
+    for i, (teams, team_scores) in enumerate(zip(matches, scores)):
+        for t, (team, score) in enumerate(zip(teams, team_scores)):
+            teams_array[i, t, : len(team)] = team
+            scores_array[i, t] = score
+
+    return teams_array, scores_array
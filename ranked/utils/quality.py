@@ -0,0 +1,69 @@
+"""Vectorized match quality, every function takes team aggregates of shape ``(match, team)``
+and returns the quality of each match, 1 being a perfectly fair match.
+"""
+
+from typing import Callable
+
+import numpy as np
+
+
+def gaussian_quality(mu, var, size, beta) -> np.ndarray:
+    """TrueSkill match quality (draw probability relative to a perfect draw)
+
+    Parameters
+    ----------
+    mu:
+        sum of the skill of the team members
+
+    var:
+        sum of the skill variance of the team members
+
+    size:
+        number of players in each team
+
+    beta:
+        performance deviation of a single player
+
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    var = np.asarray(var, dtype=np.float64)
+    size = np.broadcast_to(np.asarray(size, dtype=np.float64), mu.shape)
+
+    n_team = mu.shape[1]
+
+    # compare consecutive teams: (team - 1, team)
+    a = np.zeros((n_team - 1, n_team))
+    a[np.arange(n_team - 1), np.arange(n_team - 1)] = 1
+    a[np.arange(n_team - 1), np.arange(1, n_team)] = -1
+
+    # (match, team - 1, team - 1)
+    ata = np.einsum("it,mt,jt->mij", a, beta**2 * size, a)
+    atsa = np.einsum("it,mt,jt->mij", a, var, a)
+    middle = ata + atsa
+
+    # (match, team - 1)
+    end = mu @ a.T
+
+    e_arg = -0.5 * np.einsum(
+        "mi,mi->m", end, np.linalg.solve(middle, end[..., None])[..., 0]
+    )
+    s_arg = np.linalg.det(ata) / np.linalg.det(middle)
+    return np.exp(e_arg) * np.sqrt(s_arg)
+
+
+def pairwise_quality(mu, var, win: Callable) -> np.ndarray:
+    """Average over every pair of teams of how close the win probability is to 50%
+
+    Parameters
+    ----------
+    win:
+        vectorized function ``win(mu_a - mu_b, var_a + var_b)`` returning the
+        probability of team a winning against team b
+
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    var = np.asarray(var, dtype=np.float64)
+
+    a, b = np.triu_indices(mu.shape[1], k=1)
+    p = win(mu[:, a] - mu[:, b], var[:, a] + var[:, b])
+    return (1 - np.abs(2 * p - 1)).mean(axis=1)
@@ -0,0 +1,70 @@
+"""Numpy arrays backed by shared memory so worker processes can read them without copies.
+
+The owner creates the segment with :func:`share` or :func:`allocate` and sends its name
+to the workers which call :func:`attach`.
+"""
+
+from contextlib import suppress
+from multiprocessing import shared_memory
+from typing import Dict, Hashable, Tuple
+
+import numpy as np
+
+# shared memory segments attached by this process, by name
+_attached: Dict[str, shared_memory.SharedMemory] = dict()
+
+# latest segment attached for a given key
+_latest: Dict[Hashable, str] = dict()
+
+
+def allocate(shape, dtype) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Create a zeroed shared memory segment and the array using it"""
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array[...] = 0
+    return shm, array
+
+
+def share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Copy an array to a new shared memory segment"""
+    shm, shared = allocate(array.shape, array.dtype)
+    shared[...] = array
+    return shm, shared
+
+
+def release(name: str) -> None:
+    """Detach a segment from this process, the segment is not destroyed"""
+    shm = _attached.pop(name, None)
+
+    if shm is not None:
+        # arrays still using the buffer keep it mapped until they are collected
+        with suppress(BufferError):
+            shm.close()
+
+
+def attach(name: str, shape, dtype, key: Hashable = None) -> np.ndarray:
+    """Array using the shared memory segment ``name``, each segment is attached once per process
+
+    Parameters
+    ----------
+    key:
+        Owner of the segment, when the owner moves its data to a new segment
+        the previous segment of the same key is released
+
+    """
+    shm = _attached.get(name)
+
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+
+    if key is not None:
+        previous = _latest.get(key)
+        _latest[key] = name
+
+        if previous is not None and previous != name:
+            release(previous)
+
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
@@ -26,7 +26,8 @@ args = dict(
         "ranked",
         "ranked.models",
         "ranked.datasets",
-        "ranked.utils",
+        "ranked.utils",
+        "ranked.matchmaker",
     ],
     zip_safe=True,
     python_requires=">=3.7",
@@ -7,3 +7,22 @@ from ranked.models.noskill import NoSkill
 @pytest.mark.skipif(ERROR is not None, reason="Does not support Orion")
 def test_synthetic_callibration():
     optimize(NoSkill, max_trials=1)
+
+
+@pytest.mark.skipif(ERROR is not None, reason="Does not support Orion")
+def test_synthetic_callibration_parallel():
+    optimize(NoSkill, max_trials=2, n_workers=2)
+
+
+@pytest.mark.skipif(ERROR is not None, reason="Does not support Orion")
+def test_synthetic_callibration_fidelity():
+    optimize(NoSkill, max_trials=4, fidelity=25)
+
+
+@pytest.mark.skipif(ERROR is not None, reason="Does not support Orion")
+def test_synthetic_callibration_artifacts(tmp_path):
+    optimize(NoSkill, max_trials=1, artifacts=str(tmp_path))
+
+    trials = list(tmp_path.iterdir())
+    assert len(trials) >= 1
+    assert (trials[0] / "bootstrap.csv").exists()
@@ -0,0 +1,83 @@
+import numpy as np
+
+from ranked.models import Batch, Match, make
+from ranked.models.bradleyterry import BradleyTerry, design_matrix, fit
+
+
+def synthetic_matches(n_players=50, n_matches=5000, scale=173.7178):
+    skills = np.random.normal(1500, 200, size=n_players)
+    teams = np.random.randint(0, n_players, size=(n_matches, 2, 2))
+    # skip matches with a player in both teams
+    teams = teams[(teams[:, 0, :, None] != teams[:, 1, None, :]).all(axis=(1, 2))]
+
+    perf = skills[teams].sum(axis=-1)
+    perf += np.random.logistic(0, scale / 2, size=perf.shape)
+    return skills, teams, perf
+
+
+def test_design_matrix():
+    teams = np.array([[[0, 1], [2, -1]], [[3, -1], [1, 2]]])
+    scores = np.array([[1.0, 0.0], [2.0, 2.0]])
+
+    X, y = design_matrix(teams, scores, 4)
+
+    assert X.toarray().tolist() == [[1, 1, -1, 0], [0, -1, -1, 1]]
+    assert y.tolist() == [1, 0.5]
+
+
+def test_bradleyterry_fit():
+    np.random.seed(0)
+    skills, teams, perf = synthetic_matches()
+
+    X, y = design_matrix(teams, perf, len(skills))
+
+    for model in ("logistic", "probit"):
+        ratings = fit(X, y, np.full(len(skills), 1500.0), model=model)
+        assert np.corrcoef(ratings, skills)[0, 1] > 0.9
+
+
+def test_bradleyterry_ranker():
+    np.random.seed(0)
+    ranker = make("bradleyterry", refit=1)
+    assert isinstance(ranker, BradleyTerry)
+
+    p1, p2, p3 = [ranker.new_player() for _ in range(3)]
+
+    ranker.update(
+        Batch(
+            Match((ranker.new_team(p1), 1), (ranker.new_team(p2), 0)),
+            Match((ranker.new_team(p2), 1), (ranker.new_team(p3), 0)),
+        )
+    )
+    assert p1.skill() > p2.skill() > p3.skill()
+
+    # warm started from the current ratings
+    ranker.update(Match((ranker.new_team(p3), 1), (ranker.new_team(p1), 0)))
+    assert len(ranker.history) == 3
+    assert abs(p1.skill() - p3.skill()) < 0.1
+
+
+def test_bradleyterry_refit():
+    ranker = BradleyTerry(refit=2)
+    p1, p2, p3 = [ranker.new_player() for _ in range(3)]
+
+    # the first update is only recorded
+    ranker.update(Match((ranker.new_team(p1), 1), (ranker.new_team(p2), 0)))
+    assert len(ranker.history) == 1
+    assert p1.skill() == p2.skill() == 1500
+
+    ranker.update(Match((ranker.new_team(p2), 1), (ranker.new_team(p3), 0)))
+    assert p1.skill() > p2.skill() > p3.skill()
+    assert ranker.pending == 0
+
+    ranker.update(Match((ranker.new_team(p3), 1), (ranker.new_team(p1), 0)))
+    previous = p3.skill()
+
+    # fit refits the whole history right away
+    ranker.fit()
+    assert p3.skill() > previous
+    assert ranker.pending == 0
+
+    teams, scores = ranker.encode()
+    assert teams.tolist() == [[[0], [1]], [[1], [2]], [[2], [0]]]
+    assert scores.tolist() == [[1, 0], [1, 0], [1, 0]]
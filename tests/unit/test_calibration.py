@@ -0,0 +1,46 @@
+import numpy as np
+
+from ranked.calibration import (
+    calibration_windows,
+    generate_dataset,
+    likelihood_calibration,
+    synthetic_calibration,
+)
+from ranked.models.ensemble import Glicko2Ensemble
+from ranked.models.glicko2 import Glicko2
+
+
+def new_dataset(n_batches=20):
+    np.random.seed(0)
+    return generate_dataset(n_players=20, n_batches=n_batches)
+
+
+def test_likelihood_calibration():
+    dataset = new_dataset()
+
+    start = Glicko2Ensemble(dataset.n_players, 0.6, deviation=208.46, vol=0.3)
+    start_loglik = start.replay(dataset)[0] / dataset.offsets[-1]
+
+    params, loglik, result = likelihood_calibration(
+        dataset, "glicko2", options=dict(maxiter=5)
+    )
+
+    assert set(params) == {"tau", "deviation", "vol"}
+    assert loglik >= start_loglik
+
+
+def test_calibration_windows():
+    dataset = new_dataset()
+
+    bootstrap, benchmark = calibration_windows(dataset, 10, 10)
+    assert (bootstrap.n_batches, benchmark.n_batches) == (10, 10)
+
+    # a low fidelity run is measured on fewer batches
+    bootstrap, low = calibration_windows(dataset, 2, 10, max_bootstrap=10)
+    assert (bootstrap.n_batches, low.n_batches) == (2, 2)
+    assert np.array_equal(low.offsets, benchmark.offsets[:3])
+
+    precision = synthetic_calibration(
+        Glicko2(), 2, n_benchmark=10, dataset=dataset, max_bootstrap=10
+    )
+    assert 0 <= precision <= 1
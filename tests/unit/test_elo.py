@@ -1,7 +1,9 @@
 from typing import Tuple
 
+import numpy as np
+
 from ranked.models import Batch, Match, Player, Ranker
-from ranked.models.elo import Elo
+from ranked.models.elo import Elo, distributions
 from ranked.models.elochess import ChessElo
 
 
@@ -162,3 +164,111 @@ def test_elo_team():
             check(t2.skill(), 3069.16828441007),
         ]
     )
+
+
+def free_for_all(ranker, match):
+    """Average of the pairwise games of each team, applied through the team rating"""
+    deltas = []
+    for team, score in match.leaderboard:
+        results = [
+            (np.sign(score - other_score) + 1) / 2
+            - ranker.win(Match((team, score), (other, other_score)))
+            for other, other_score in match.leaderboard
+            if other is not team
+        ]
+        deltas.append(ranker.k * sum(results) / len(results))
+
+    for team, delta in zip(match.players, deltas):
+        team.mu += delta
+
+
+def test_elo_team_batch():
+    def new_batch(ranker):
+        players = [ranker.new_player(s) for s in np.linspace(0.1, 0.5, 50)]
+        teams = [ranker.new_team(*players[i : i + 5]) for i in range(0, 50, 5)]
+        batch = Batch(
+            Match((teams[0], 1), (teams[1], 0)),
+            Match((teams[2], 0), (teams[3], 0)),
+            Match((teams[4], 2), (teams[5], 1), (teams[6], 0)),
+            Match((teams[7], 0), (teams[8], 1), (teams[9], 1)),
+        )
+        return players, batch
+
+    ranker = Elo(1)
+
+    # one match at a time, the change of a team is split by its rating setter
+    expected, batch = new_batch(ranker)
+    for match in batch:
+        if len(match) == 2:
+            ranker.update_match(match)
+        else:
+            free_for_all(ranker, match)
+
+    players, batch = new_batch(ranker)
+    ranker.update_batch(batch)
+
+    assert not np.allclose([p.skill() for p in players], np.linspace(0.1, 0.5, 50))
+    for a, b in zip(expected, players):
+        # the vectorized erfc is an approximation
+        assert nearly(a.skill(), b.skill(), 1e-6)
+
+
+def test_elo_free_for_all():
+    ranker = ChessElo()
+
+    p1, p2, p3 = [ranker.new_player(1500) for _ in range(3)]
+    ranker.update(Match((p1, 3), (p2, 2), (p3, 1)))
+
+    # average of the pairwise games
+    assert nearly(p1.skill(), 1516)
+    assert nearly(p2.skill(), 1500)
+    assert nearly(p3.skill(), 1484)
+
+
+def test_elo_distributions():
+    from scipy.stats import logistic, norm
+
+    delta = np.linspace(-5, 5, 101)
+
+    for name, dist in (("norm", norm), ("logistic", logistic)):
+        for ranker in (Elo(1, name), Elo(1, dist)):
+            expected = dist.cdf(delta / np.sqrt(2))
+
+            assert np.allclose(ranker.expectation(delta), expected, atol=1e-7)
+            assert nearly(ranker._cdf(1.5), dist.cdf(1.5), 1e-12)
+
+    # dist is an object with a cdf method, like the scipy distributions
+    assert Elo(1).dist.cdf(0) == 0.5
+    assert np.allclose(Elo(1).dist.cdf(delta), norm.cdf(delta), atol=1e-7)
+    assert Elo(1, logistic).dist is logistic
+
+    # other distributions are computed by scipy
+    ranker = Elo(1, "cauchy")
+    assert nearly(ranker.expectation(np.sqrt(2)), 0.75, 1e-12)
+
+    # frozen distributions do not have a name
+    ranker = Elo(1, norm(0, 2))
+    assert nearly(ranker.expectation(np.sqrt(2)), norm.cdf(0.5), 1e-12)
+
+
+def test_elo_match_batch_agree():
+    def new_batch(ranker):
+        players = [ranker.new_player(s) for s in np.linspace(-3, 3, 40)]
+        batch = Batch(
+            *[Match((players[i], i % 3), (players[39 - i], 1)) for i in range(20)]
+        )
+        return players, batch
+
+    for name in distributions:
+        ranker = Elo(1, name)
+
+        expected, batch = new_batch(ranker)
+        for match in batch:
+            ranker.update_match(match)
+
+        players, batch = new_batch(ranker)
+        ranker.update_batch(batch)
+
+        for a, b in zip(expected, players):
+            # the vectorized erfc is an approximation
+            assert nearly(a.skill(), b.skill(), 1e-6)
@@ -0,0 +1,82 @@
+import pickle
+
+import numpy as np
+
+from ranked.datasets.encoded import EncodedMatchup
+from ranked.datasets.synthetic import (
+    MatchupReplaySaver,
+    SimulationConfig,
+    create_simulated_matchups,
+)
+from ranked.models.glicko2 import Glicko2
+
+
+def new_matchup(ranker, n_matches=10):
+    config = SimulationConfig(1500, 500 / 3, 32, 64, 16)
+    return create_simulated_matchups(ranker, 20, n_matches, 2, 5, config=config)
+
+
+def test_encoded_replay():
+    np.random.seed(0)
+    ranker = Glicko2()
+    matchup = new_matchup(ranker)
+
+    batches = list(matchup.matches())
+    dataset = EncodedMatchup.encode(iter(batches), matchup.pool)
+
+    assert dataset.teams.shape == (20, 2, 5)
+    assert dataset.n_batches == 10
+
+    other = Glicko2()
+    replay = dataset.bind(other)
+
+    for original, replayed in zip(batches, replay.matches()):
+        for m1, m2 in zip(original, replayed):
+            assert m1.scores == m2.scores
+
+            for t1, t2 in zip(m1.teams, m2.teams):
+                assert [matchup.pool.index(p) for p in t1] == [
+                    replay.pool.index(p) for p in t2
+                ]
+
+    window = replay.window(2, 5)
+    assert window.pool is replay.pool
+    assert len(list(window.matches())) == 3
+
+
+def test_encoded_shared():
+    np.random.seed(0)
+    ranker = Glicko2()
+    matchup = new_matchup(ranker)
+    dataset = EncodedMatchup.encode(matchup.matches(), matchup.pool).share()
+
+    try:
+        data = pickle.dumps(dataset)
+        assert len(data) < dataset.teams.nbytes
+
+        copy = pickle.loads(data)
+        assert (copy.teams == dataset.teams).all()
+        assert (copy.offsets == dataset.offsets).all()
+        del copy
+    finally:
+        dataset.close()
+
+
+def test_encoded_load(tmp_path):
+    np.random.seed(0)
+    ranker = Glicko2()
+    matchup = new_matchup(ranker, 3)
+
+    fname = str(tmp_path / "replay.json")
+    with MatchupReplaySaver(fname) as saver:
+        saver.save_pool(matchup.pool)
+
+        for i in range(3):
+            matches = matchup.mm.matches()
+            for teams, result in zip(matches, matchup.sim.simulate_batch(matches)):
+                saver.save(i, teams, result)
+
+    dataset = EncodedMatchup.load(fname)
+    assert dataset.n_players == 20
+    assert dataset.n_batches == 3
+    assert dataset.teams.shape == (6, 2, 5)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from ranked.datasets.encoded import EncodedMatchup
+from ranked.datasets.synthetic import SimulationConfig, create_simulated_matchups
+from ranked.models.elo import Elo
+from ranked.models.ensemble import EloEnsemble, Glicko2Ensemble
+from ranked.models.glicko2 import Glicko2
+
+
+def new_dataset(n_matches=10):
+    np.random.seed(0)
+    ranker = Glicko2()
+    config = SimulationConfig(1500, 500 / 3, 32, 64, 16)
+    matchup = create_simulated_matchups(ranker, 20, n_matches, 2, 5, config=config)
+    return EncodedMatchup.encode(matchup.matches(), matchup.pool)
+
+
+def test_elo_ensemble():
+    dataset = new_dataset()
+
+    ensemble = EloEnsemble(dataset.n_players, [200, 100], [0.5, 1], center=1500)
+    ensemble.replay(dataset)
+
+    for i, (vol, alpha) in enumerate([(200, 0.5), (100, 1)]):
+        ranker = Elo(vol, alpha=alpha)
+        pool = [ranker.new_player(1500) for _ in range(dataset.n_players)]
+
+        for batch in dataset.bind(ranker, pool).matches():
+            ranker.update(batch)
+
+        expected = [p.skill() for p in pool]
+        assert np.allclose(ensemble.ratings[i], expected)
+
+
+def test_glicko2_ensemble():
+    dataset = new_dataset()
+
+    ensemble = Glicko2Ensemble(dataset.n_players, [0.3, 0.9])
+    ensemble.replay(dataset)
+
+    for i, tau in enumerate([0.3, 0.9]):
+        ranker = Glicko2(tau=tau)
+        matchup = dataset.bind(ranker)
+
+        for batch in matchup.matches():
+            ranker.cache.clear()
+            ranker.update(batch)
+
+        assert np.allclose(ensemble.ratings[i], [p.rating for p in matchup.pool])
+        assert np.allclose(ensemble.deviations[i], [p.deviation for p in matchup.pool])
+        assert np.allclose(
+            ensemble.volatilities[i], [p.volatility for p in matchup.pool], atol=1e-5
+        )
+
+    teams = dataset.teams[:2]
+    assert ensemble.predict(teams).shape == (2, 2)
@@ -175,3 +175,36 @@ def test_glicko2_team():
             check(t2.volatility, 0.0848529507874745),
         ]
     )
+
+
+def test_glicko2_free_for_all():
+    ranker = Glicko2()
+
+    p1, p2, p3 = [ranker.new_player(1500, 200) for _ in range(3)]
+    ranker.update(Match((p1, 3), (p2, 2), (p3, 1)))
+
+    assert p1.rating > p2.rating > p3.rating
+    assert nearly(p2.rating, 1500)
+    assert nearly(p1.rating - 1500, 1500 - p3.rating)
+
+    # a three teams match is two games for each team
+    q1, q2, q3 = [ranker.new_player(1500, 200) for _ in range(3)]
+    batch = Batch(Match((q1, 1), (q2, 0)), Match((q1, 1), (q3, 0)))
+    assert nearly(
+        ranker.estimated_variance(q1, batch),
+        ranker.estimated_variance(q1, Batch(Match((q1, 2), (q2, 1), (q3, 1)))),
+    )
+
+
+def test_glicko2_team_update():
+    ranker = Glicko2(tau=0.2)
+
+    t1, _, _ = get_team_match_batch(ranker)
+    players = list(t1)
+    shares = [p.rating / t1.rating for p in players]
+
+    t1.update(3101.0, 150.0, 0.1)
+
+    assert check(t1.rating, 3101.0)
+    for p, share in zip(players, shares):
+        assert check(p.rating / t1.rating, share)
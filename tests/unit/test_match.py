@@ -5,3 +5,21 @@ def test_match():
     m = Match(("Player1", 200), ("Player2", 100), ("Player3", 300))
 
     return m.get_ranks() == [1, 2, 0]
+
+
+def test_lazy_registry():
+    import importlib
+    import subprocess
+    import sys
+
+    from ranked.models import registered_models
+
+    for name, module in registered_models.items():
+        assert hasattr(importlib.import_module(module), "make"), name
+
+    # models are only imported when they are built
+    code = "import sys, ranked.models; print('trueskill' in sys.modules, 'openskill' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False False"
@@ -0,0 +1,321 @@
+import numpy as np
+
+from ranked.matchmaker import Matchmaker
+from ranked.models.elo import EloPlayer
+
+
+def new_pool(n):
+    return [EloPlayer(s) for s in np.random.normal(1500, 200, size=n)]
+
+
+def check_sorted(mm):
+    mm.refresh()
+    expected = sorted(
+        (i for i, a in enumerate(mm.active[: len(mm.players)]) if a),
+        key=lambda i: mm.players[i].skill(),
+    )
+    assert mm.players_pid.tolist() == expected
+
+
+def test_matchmaker_index():
+    np.random.seed(0)
+    pool = new_pool(105)
+    mm = Matchmaker(pool, 2, 5)
+
+    for _ in range(5):
+        matches = mm.matches()
+        assert len(matches) == 10
+
+        for teams in matches:
+            assert len(teams) == 2
+            assert all(len(team) == 5 for team in teams)
+
+            # simulate a skill update
+            for team in teams:
+                for pid in team:
+                    pool[pid].mu += np.random.normal(0, 100)
+
+    check_sorted(mm)
+
+    mm.remove_players([0, 1, 2])
+    mm.add_players(new_pool(7))
+    check_sorted(mm)
+    assert mm.n_active == 109
+
+
+def test_matchmaker_mark_dirty():
+    np.random.seed(0)
+    pool = new_pool(20)
+    mm = Matchmaker(pool, 2, 5)
+    mm.refresh()
+
+    pool[3].mu += 500
+    mm.mark_dirty([3, 3, 7])
+    mm.mark_dirty([7, 3])
+    assert mm._dirty[0].tolist() == [3, 7]
+    assert len(mm._dirty[1]) == 0
+
+    check_sorted(mm)
+    assert len(mm.players_pid) == 20
+
+
+def test_matchmaker_carry_over():
+    np.random.seed(0)
+    pool = new_pool(105)
+    mm = Matchmaker(pool, 2, 5)
+
+    # 5 players sit out each round, they are matched first in the next round
+    previous = set()
+    for _ in range(6):
+        matches = mm.matches()
+        matched = {pid for teams in matches for team in teams for pid in team}
+
+        left_out = set(range(105)) - matched
+        assert len(left_out) == 5
+        assert not (previous & left_out)
+        assert mm.wait[list(left_out)].tolist() == [1] * 5
+
+        previous = left_out
+
+    assert mm.last_wait.max() == 1
+
+
+def test_matchmaker_lobby_sizes():
+    np.random.seed(0)
+    pool = new_pool(104)
+    mm = Matchmaker(pool, 2, 5, lobby_sizes=[(2, 4), (2, 3)])
+
+    # one 5v5 is replaced by a 4v4 and a 3v3 so nobody sits out
+    assert mm.plan(104) == [(9, 2, 5), (1, 2, 4), (1, 2, 3)]
+    assert mm.n_matches == 11
+
+    matches = mm.matches()
+    sizes = sorted(len(teams[0]) for teams in matches)
+    assert sizes == [3, 4] + [5] * 9
+
+    matched = [pid for teams in matches for team in teams for pid in team]
+    assert sorted(matched) == list(range(104))
+
+
+def test_queue_matchmaker_widen():
+    from ranked.matchmaker.queue import QueueMatchmaker
+
+    now = [0]
+    mm = QueueMatchmaker(
+        n_team=2, n_players=1, window=10, widen=10, clock=lambda: now[0]
+    )
+
+    assert mm.join(0, 1500) is None
+    assert mm.join(1, 1550) is None
+    assert mm.tick() == []
+
+    # both windows grew to 30, not enough
+    now[0] = 2
+    assert mm.tick() == []
+
+    # both windows grew to 50
+    now[0] = 4
+    assert mm.tick() == [[[1], [0]]]
+    assert len(mm) == 0
+
+
+def test_queue_matchmaker_closest():
+    from ranked.matchmaker.queue import QueueMatchmaker
+
+    mm = QueueMatchmaker(n_team=2, n_players=1, window=10, widen=0)
+
+    # too far from each other to be matched together
+    assert mm.join(0, 10.5) is None
+    assert mm.join(1, 20.9) is None
+
+    # player 0 shares the skill bucket but player 1 in the next bucket is closer
+    assert sorted(mm.join(2, 19)) == [[1], [2]]
+    assert list(mm.waiting) == [0]
+
+
+def test_queue_matchmaker_lobby_window():
+    from ranked.matchmaker.queue import QueueMatchmaker
+
+    mm = QueueMatchmaker(n_team=2, n_players=2, window=10, widen=0)
+
+    # -9 and 9 both accept 0 and 0.5 but not each other
+    for pid, skill in enumerate([-9, 9, 0]):
+        assert mm.process(("join", pid, skill, 0)) is None
+    assert mm.process(("join", 3, 0.5, 0)) is None
+
+    match = mm.process(("join", 4, 1, 0))
+    lobby = sorted(pid for team in match for pid in team)
+    assert lobby == [1, 2, 3, 4]
+    assert list(mm.waiting) == [0]
+
+
+def test_queue_matchmaker_async():
+    import asyncio
+
+    from ranked.matchmaker.queue import QueueMatchmaker
+
+    async def main():
+        mm = QueueMatchmaker(n_team=2, n_players=2, window=100)
+        events = asyncio.Queue()
+
+        for pid in range(9):
+            events.put_nowait(("join", pid, 1500 + pid, 0))
+
+        events.put_nowait(("leave", 8))
+        events.put_nowait(None)
+
+        await mm.run(events)
+        return mm
+
+    mm = asyncio.run(main())
+    assert mm.output.qsize() == 2
+    assert len(mm) == 0
+
+
+def test_balance_partition():
+    from ranked.matchmaker.balance import balance_lobby, partition, strategies
+
+    np.random.seed(0)
+    skills = np.random.normal(1500, 100, size=(100, 12))
+
+    def spread(teams, n_team):
+        sums = np.stack([np.where(teams == t, skills, 0).sum(1) for t in range(n_team)])
+        return (sums.max(0) - sums.min(0)).mean()
+
+    for n_team in (2, 3):
+        baseline = spread(partition(skills, n_team, "roundrobin"), n_team)
+
+        for method in strategies:
+            teams = partition(skills, n_team, method)
+
+            for t in range(n_team):
+                assert np.all((teams == t).sum(1) == 12 // n_team)
+
+            if method != "roundrobin":
+                assert spread(teams, n_team) < baseline / 4
+
+    teams = balance_lobby(skills[0].tolist(), 2)
+    assert sorted(teams) == [0] * 6 + [1] * 6
+
+
+def test_quality_matchmaker():
+    from ranked.matchmaker.quality import QualityMatchmaker
+    from ranked.models.noskill import NoSkill
+
+    np.random.seed(0)
+    ranker = NoSkill(1500, 173)
+    pool = [ranker.new_player(s) for s in np.random.normal(1500, 200, size=103)]
+
+    mm = QualityMatchmaker(pool, ranker, 2, 5)
+    matches = mm.matches()
+
+    players = [pid for teams in matches for team in teams for pid in team]
+    assert len(players) == len(set(players))
+    assert len(matches) >= 9
+
+    for teams in matches:
+        assert [len(team) for team in teams] == [5, 5]
+
+
+def test_party_matchmaker():
+    from ranked.matchmaker.party import PartyMatchmaker
+
+    np.random.seed(0)
+    pool = new_pool(1000)
+    mm = PartyMatchmaker(pool, 2, 5)
+
+    parties = []
+    pid = 0
+    while pid < len(pool):
+        size = min(np.random.choice([1, 1, 1, 2, 2, 3, 5]), len(pool) - pid)
+        members = list(range(pid, pid + size))
+        parties.append(members)
+        mm.add_party(members)
+        pid += size
+
+    matches = mm.matches()
+    matched = [pid for teams in matches for team in teams for pid in team]
+
+    assert len(matched) == len(set(matched))
+    assert len(matched) >= 900
+
+    team_of = {
+        pid: (i, t)
+        for i, teams in enumerate(matches)
+        for t, team in enumerate(teams)
+        for pid in team
+    }
+    for members in parties:
+        teams = {team_of.get(pid) for pid in members}
+        assert len(teams) == 1
+
+    for teams in matches:
+        assert [len(team) for team in teams] == [5, 5]
+
+    # matched parties left the queue
+    assert len(mm.parties) < len(parties) - len(matches)
+
+
+def test_sharded_matchmaker():
+    from ranked.matchmaker.sharded import ShardedMatchmaker
+
+    np.random.seed(0)
+    pool = new_pool(1000)
+    buckets = np.random.randint(0, 4, size=len(pool))
+
+    for workers, backfill in ((0, False), (0, True), (1, True)):
+        with ShardedMatchmaker(pool, buckets, workers=workers, backfill=backfill) as mm:
+            matches = mm.matches()
+
+        matched = [pid for teams in matches for team in teams for pid in team]
+        assert len(matched) == len(set(matched))
+
+        if backfill:
+            assert len(matches) == 100
+        else:
+            for teams in matches:
+                assert len({buckets[pid] for team in teams for pid in team}) == 1
+
+
+def test_sharded_matchmaker_grow():
+    from ranked.matchmaker.sharded import ShardedMatchmaker
+
+    np.random.seed(0)
+    pool = new_pool(100)
+
+    with ShardedMatchmaker(pool, [0] * len(pool), workers=1) as mm:
+        mm.matches()
+
+        # the capacity doubles, the segment is only replaced when it is full
+        mm.add_players(new_pool(10), [1] * 10)
+        name = mm.shm.name
+        assert len(mm.skills) == 200
+
+        for _ in range(9):
+            mm.add_players(new_pool(10), [1] * 10)
+        assert mm.shm.name == name
+
+        mm.add_players(new_pool(10), [1] * 10)
+        assert mm.shm.name != name
+        assert len(mm.skills) == 400
+
+        matches = mm.matches()
+        assert len(matches) == 21
+        assert np.allclose(mm.skills[:210], [p.skill() for p in pool])
+
+
+def test_matchmaker_benchmark():
+    from ranked.matchmaker.benchmark import benchmark, matchmakers
+
+    np.random.seed(0)
+    for name in ("sorted", "quality", "sharded-workers", "queue", "party"):
+        metrics = benchmark(matchmakers[name], n_players=1005, rounds=3)
+
+        assert metrics["rounds_per_sec"] > 0
+        assert 0 < metrics["utilization"] <= 1
+        assert metrics["wait_max"] <= 2
+        assert metrics["team_diff_mean"] >= 0
+
+        # players still in queue are reported apart
+        assert 0 < metrics["queued"] < 0.1
+        assert metrics["queued_wait_max"] >= 1
@@ -1,6 +1,11 @@
 from typing import Tuple
 
+import numpy as np
+
+from ranked.datasets.encoded import EncodedMatchup
+from ranked.datasets.synthetic import SimulationConfig, create_simulated_matchups
 from ranked.models import Batch, Match, Player, Ranker
+from ranked.models.glicko2 import Glicko2
 from ranked.models.noskill import NoSkill
 
 
@@ -102,3 +107,46 @@ def test_noskill_team():
             check(t2.skill(), 3061.6974899161874),
         ]
     )
+
+
+def encoded_dataset(n_matches=10):
+    np.random.seed(0)
+    config = SimulationConfig(1500, 500 / 3, 32, 64, 16)
+    matchup = create_simulated_matchups(Glicko2(), 20, n_matches, 2, 5, config=config)
+    return EncodedMatchup.encode(matchup.matches(), matchup.pool), matchup
+
+
+def test_noskill_smooth_filter():
+    dataset, _ = encoded_dataset()
+    ranker = NoSkill(1500, 173)
+
+    # the forward pass alone is the usual sequential update
+    sequential = dataset.bind(ranker)
+    for batch in sequential.matches():
+        ranker.update(batch)
+
+    smoothed = dataset.bind(ranker)
+    mu, sigma = ranker.smooth(smoothed, sweeps=0)
+
+    assert mu.shape == dataset.teams.shape
+    for a, b in zip(sequential.pool, smoothed.pool):
+        assert nearly(a.skill(), b.skill(), 1e-6)
+        assert nearly(a.consistency(), b.consistency(), 1e-6)
+
+
+def test_noskill_smooth():
+    dataset, matchup = encoded_dataset(40)
+    skills = np.asarray(matchup.model.skills)
+    ranker = NoSkill(1500, 500 / 3, tau=1)
+
+    filtered, _ = ranker.smooth(dataset, sweeps=0)
+    smoothed, sigma = ranker.smooth(dataset, sweeps=10)
+
+    # later matches improve the estimates of the first batch
+    first = slice(0, int(dataset.offsets[1]))
+    truth = skills[dataset.teams[first]].ravel()
+    corr_filtered = np.corrcoef(filtered[first].ravel(), truth)[0, 1]
+    corr_smoothed = np.corrcoef(smoothed[first].ravel(), truth)[0, 1]
+
+    assert corr_smoothed > corr_filtered
+    assert np.nanmean(sigma[first]) < 500 / 3
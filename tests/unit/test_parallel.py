@@ -0,0 +1,79 @@
+import pytest
+
+from ranked.models import Batch, Match
+from ranked.models.elo import Elo
+from ranked.models.glicko2 import Glicko2
+from ranked.models.noskill import NoSkill
+from ranked.models.parallel import ParallelRanker
+
+
+def disjoint_batch(ranker, n_matches=7):
+    players = [ranker.new_player(1500 + i * 10) for i in range(n_matches * 4)]
+    teams = [ranker.new_team(*players[i : i + 2]) for i in range(0, len(players), 2)]
+
+    batch = Batch(
+        *[Match((teams[i], i % 3), (teams[i + 1], 1)) for i in range(0, len(teams), 2)]
+    )
+    return players, batch
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+@pytest.mark.parametrize("klass", [NoSkill, Glicko2, Elo])
+def test_parallel_ranker(klass, mode):
+    ranker = klass(1500)
+    expected, batch = disjoint_batch(ranker)
+    ranker.update(batch)
+
+    with ParallelRanker(klass(1500), workers=3, mode=mode) as parallel:
+        players, batch = disjoint_batch(parallel)
+        parallel.update(batch)
+
+    for a, b in zip(expected, players):
+        assert a.skill() == pytest.approx(b.skill())
+        assert a.consistency() == pytest.approx(b.consistency())
+
+
+def test_parallel_ranker_shared_states():
+    ranker = NoSkill(1500)
+    expected = [disjoint_batch(ranker, n) for n in (7, 5, 9)]
+    for _, batch in expected:
+        ranker.update(batch)
+
+    with ParallelRanker(NoSkill(1500), workers=2, mode="process") as parallel:
+        results = [disjoint_batch(parallel, n) for n in (7, 5, 9)]
+
+        parallel.update(results[0][1])
+        name = parallel.shm.name
+
+        # the states are reused until the capacity is exceeded
+        parallel.update(results[1][1])
+        assert parallel.shm.name == name
+
+        parallel.update(results[2][1])
+        assert parallel.shm.name != name
+
+    for (a, _), (b, _) in zip(expected, results):
+        assert [p.skill() for p in a] == pytest.approx([p.skill() for p in b])
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_parallel_ranker_stateful(mode):
+    from ranked.models.bradleyterry import BradleyTerry
+    from ranked.models.whr import WHR
+
+    for klass in (WHR, BradleyTerry):
+        with pytest.raises(ValueError):
+            ParallelRanker(klass(), workers=2, mode=mode)
+
+    # a single worker updates the ranker itself
+    whr = WHR()
+    _, batch = disjoint_batch(whr)
+    ParallelRanker(whr, workers=1, mode=mode).update(batch)
+    assert whr.time == 1
+    assert whr.n_games == 7
+
+    bt = BradleyTerry()
+    _, batch = disjoint_batch(bt)
+    ParallelRanker(bt, workers=1, mode=mode).update(batch)
+    assert len(bt.history) == 7
+    assert len(bt.players) == 28
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+
+from ranked.datasets.synthetic import SimulationConfig, create_simulated_matchups
+from ranked.models.glicko2 import Glicko2
+from ranked.simulation import Simulation
+
+
+def test_simulation_sinks():
+    np.random.seed(0)
+    ranker = Glicko2()
+    config = SimulationConfig(1500, 500 / 3, 32, 64, 16)
+    matchup = create_simulated_matchups(ranker, 20, 5, 2, 5, config=config)
+    sim = Simulation(ranker, matchup)
+
+    # nothing is saved
+    sim.simulate(statfs=None)
+
+    # rows are kept in memory
+    buffer = io.StringIO()
+    sim.simulate(statfs=buffer)
+
+    rows = buffer.getvalue().strip().split("\n")
+    assert rows[0] == "#match,pid,skill,cons,method,diff,win"
+    assert len(rows) == 1 + 6 * 20
+
+
+def test_multi_simulation():
+    from ranked.datasets.encoded import EncodedMatchup
+    from ranked.models.elo import Elo
+    from ranked.simulation import MultiSimulation
+
+    np.random.seed(0)
+    config = SimulationConfig(1500, 500 / 3, 32, 64, 16)
+    matchup = create_simulated_matchups(Glicko2(), 20, 5, 2, 5, config=config)
+    dataset = EncodedMatchup.encode(matchup.matches(), matchup.pool)
+
+    for workers in (0, 2):
+        rankers = dict(elo=Elo(200), glicko2=Glicko2())
+        buffer = io.StringIO()
+
+        pools = MultiSimulation(rankers, dataset, workers=workers).simulate(
+            dict(elo=buffer)
+        )
+
+        # same result as replaying each ranker on its own
+        for name, klass in dict(elo=lambda: Elo(200), glicko2=Glicko2).items():
+            ranker = klass()
+            replay = dataset.bind(ranker)
+            expected = io.StringIO()
+            Simulation(ranker, replay).simulate(statfs=expected)
+
+            for a, b in zip(replay.pool, pools[name]):
+                assert a.skill() == b.skill()
+
+            if name == "elo":
+                assert buffer.getvalue() == expected.getvalue()
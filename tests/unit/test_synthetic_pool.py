@@ -0,0 +1,153 @@
+import numpy as np
+
+from ranked.datasets.synthetic import (
+    ChurnModel,
+    InactivityDecay,
+    LearningCurveDrift,
+    RandomWalkDrift,
+    SimulationConfig,
+    SyntheticPlayerPool,
+    create_simulated_matchups,
+)
+from ranked.models.glicko2 import Glicko2
+
+
+def test_pool_grow():
+    pool = SyntheticPlayerPool(10, SimulationConfig())
+
+    pids = pool.add_players(100)
+    assert pids.tolist() == list(range(10, 110))
+    assert pool.size == 110
+    assert pool.skills.shape == (110,)
+
+    pool.retire_players(pids[:50])
+    assert len(pool.active_pids()) == 60
+
+    perf = pool.performances(np.array([[0, 1], [2, 3]]))
+    assert perf.shape == (2, 2)
+
+
+def test_churn_matchup():
+    np.random.seed(0)
+    ranker = Glicko2()
+
+    matchup = create_simulated_matchups(
+        ranker,
+        100,
+        n_matches=10,
+        n_team=2,
+        n_player_per_team=5,
+        churn=ChurnModel(arrival_rate=20, retire_rate=0.1),
+    )
+
+    for batch in matchup.matches():
+        ranker.update(batch)
+
+        for match in batch:
+            for team in match.teams:
+                for player in team:
+                    assert player is not None
+
+    active = matchup.model.active_pids()
+    matchup.mm.refresh()
+    assert sorted(matchup.mm.players_pid.tolist()) == active.tolist()
+    assert len(matchup.pool) == matchup.model.size
+
+
+def test_replace_player():
+    np.random.seed(0)
+    ranker = Glicko2()
+    matchup = create_simulated_matchups(
+        ranker, 20, n_matches=2, n_team=2, n_player_per_team=5
+    )
+    matchup.retire_players([5])
+    assert matchup.mm.n_active == 19
+
+    old = matchup.pool[0]
+    matchup.replace_player(i=0)
+    matchup.replace_player(i=5)
+    assert matchup.pool[0] is not old
+    assert matchup.mm.n_active == 20
+
+    for batch in matchup.matches():
+        ranker.update(batch)
+
+        # the retired player is back and the first player is found
+        matched = {id(p) for match in batch for team in match.teams for p in team}
+        assert id(matchup.pool[0]) in matched
+        assert id(matchup.pool[5]) in matched
+
+
+def test_skill_drift():
+    np.random.seed(0)
+    pool = SyntheticPlayerPool(
+        100,
+        SimulationConfig(),
+        drift=[
+            LearningCurveDrift(gap=5, rate=0.5),
+            InactivityDecay(0.5, grace=2, max_loss=20),
+        ],
+    )
+
+    assert np.allclose(pool.potentials - pool.skills, 5, atol=1e-9)
+
+    played = np.arange(50)
+    for _ in range(10):
+        pool.step(played)
+
+    # players that played caught up to their potential
+    assert np.allclose(pool.potentials[:50] - pool.skills[:50], 5 * 0.5**10)
+
+    # idle players decayed from the 3rd idle batch: 8 * 0.5 below their starting skill
+    assert np.all(pool.idle[50:] == 10)
+    assert np.allclose(pool.potentials[50:] - pool.skills[50:], 5 + 8 * 0.5)
+
+
+def test_skill_drift_max_loss():
+    np.random.seed(0)
+    pool = SyntheticPlayerPool(
+        100, SimulationConfig(), drift=[InactivityDecay(1, grace=2, max_loss=6)]
+    )
+
+    played = np.arange(50)
+    for _ in range(4):
+        pool.step(played)
+
+    assert np.allclose(pool.potentials[:50], pool.skills[:50])
+    assert np.allclose(pool.potentials[50:] - pool.skills[50:], 2)
+
+    for _ in range(10):
+        pool.step(played)
+
+    # the loss stops at max_loss
+    assert np.allclose(pool.potentials[50:] - pool.skills[50:], 6)
+
+
+def test_random_walk_drift():
+    np.random.seed(0)
+    pool = SyntheticPlayerPool(1000, SimulationConfig(), drift=[RandomWalkDrift(1)])
+    pool.retire_players(np.arange(500))
+
+    for _ in range(16):
+        pool.step(np.arange(500, 1000))
+
+    change = pool.skills - pool.potentials
+    assert np.all(change[:500] == 0)
+    assert abs(change[500:].std() - 4) < 0.5
+
+
+def test_tracking_error():
+    np.random.seed(0)
+    ranker = Glicko2()
+    matchup = create_simulated_matchups(
+        ranker, 100, n_matches=10, n_team=2, n_player_per_team=5
+    )
+
+    # estimates on a different scale but in the same order have no error
+    for pid, skill in enumerate(matchup.model.skills):
+        matchup.pool[pid] = ranker.new_player(1500 + 3 * skill)
+    assert matchup.tracking_error() < 1e-9
+
+    for pid, skill in enumerate(matchup.model.skills):
+        matchup.pool[pid] = ranker.new_player(1500 - 3 * skill)
+    assert abs(matchup.tracking_error() - 2) < 1e-9
@@ -0,0 +1,110 @@
+import numpy as np
+
+from ranked.models import Batch, Match, Team, make
+from ranked.models.whr import WHR
+
+
+def test_whr_ranker():
+    ranker = make("whr")
+    assert isinstance(ranker, WHR)
+
+    p1, p2, p3 = [ranker.new_player() for _ in range(3)]
+
+    ranker.update(
+        Batch(
+            Match((ranker.new_team(p1), 1), (ranker.new_team(p2), 0)),
+        )
+    )
+    assert p1.skill() > 1500 > p2.skill()
+    assert p3.skill() == 1500
+    assert p3.days == []
+
+    # players are registered when they first play
+    assert ranker.players == [p1, p2]
+
+    ranker.update(Match((ranker.new_team(p2), 1), (ranker.new_team(p3), 0)))
+    assert p1.days == [0]
+    assert p2.days == [0, 1]
+    assert p3.days == [1]
+    assert p2.consistency() > 0
+    assert ranker.players == [p1, p2, p3]
+
+
+def test_whr_trajectory():
+    np.random.seed(0)
+    ranker = WHR(drift=100, iterations=1)
+
+    # player 0 improves over time against a fixed field
+    players = [ranker.new_player() for _ in range(6)]
+    skills = np.array([1200.0, 1300, 1400, 1500, 1600, 1700])
+
+    for t in range(30):
+        skills[0] = 1100 + t * 25
+
+        matches = []
+        for other in range(1, 6):
+            delta = (skills[0] - skills[other]) / 173.7178
+            win = np.random.uniform() < 1 / (1 + np.exp(-delta))
+            matches.append(
+                Match(
+                    (ranker.new_team(players[0]), int(win)),
+                    (ranker.new_team(players[other]), int(not win)),
+                )
+            )
+
+        # a player only has one rating per time step
+        ranker.update(Batch(*matches))
+
+    ranker.fit(5)
+
+    days, ratings = players[0].trajectory()
+    assert days == list(range(30))
+    assert np.corrcoef(days, ratings)[0, 1] > 0.8
+    assert ratings[-1] - ratings[0] > 200
+
+
+def test_whr_gradient():
+    ranker = WHR()
+    players = [ranker.new_player() for _ in range(7)]
+
+    # 2v2, 3 teams free for all and a 1v1 over two time steps
+    days = [
+        [
+            Match(
+                (ranker.new_team(*players[0:2]), 1),
+                (ranker.new_team(*players[2:4]), 0),
+            ),
+            Match((players[4], 2), (players[5], 1), (players[6], 1)),
+        ],
+        [Match((players[0], 0), (players[6], 1))],
+    ]
+    for matches in days:
+        ranker.update(Batch(*matches))
+
+    def rating(team, day):
+        members = list(team) if isinstance(team, Team) else [team]
+        return sum(p.r[p.days.index(day)] for p in members)
+
+    # every pair of teams of a game is a Bradley-Terry comparison
+    for player in ranker.players:
+        g = np.zeros(len(player.days))
+        h = np.zeros(len(player.days))
+
+        for day, matches in enumerate(days):
+            for match in matches:
+                for team, score in zip(match.teams, match.scores):
+                    if player not in (team if isinstance(team, Team) else [team]):
+                        continue
+
+                    k = player.days.index(day)
+                    for other, other_score in zip(match.teams, match.scores):
+                        if other is team:
+                            continue
+
+                        p = 1 / (1 + np.exp(rating(other, day) - rating(team, day)))
+                        g[k] += (np.sign(score - other_score) + 1) / 2 - p
+                        h[k] += p * (1 - p)
+
+        expected_g, expected_h = ranker._gradient(player)
+        assert np.allclose(g, expected_g)
+        assert np.allclose(h, expected_h)